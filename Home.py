@@ -1,23 +1,30 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import base64
+from flights import assets, figures, profile, query, sample, sections, status, warmup
+from flights.derive import month_label
+from flights.status import DELAY_LABELS
 
 st.set_page_config(
     page_title="Home",
     page_icon='✈️'
     )
 
-# reading the gif file as binary data and then encoding it as a base64, and storing the result as a string.
-with open("data/airport.gif", "rb") as f:
-    gif_data = f.read()
-gif = base64.b64encode(gif_data).decode()
+# loading the data in the background if the server wasn't started with flights.serve, and showing whether it is ready.
+warmup.start()
+warmup.show_status()
+
+# timing each chart section when profiling is turned on (FLIGHTS_PROFILE=1).
+profile.start('Home')
+
+# the url of the gif, which is served as a static file so the browser only downloads it once instead of on every rerun.
+gif = assets.image_url("airport.gif")
 
 # creating a centrerd layout with the gif and tile being in the same line and there being 10 pixels of space between the gif and title.
 st.markdown(
     f"""
     <div style="display: flex; justify-content: center; align-items: center;">
-        <img src="data:image/gif;base64,{gif}" alt="gif" width="100">
+        <img src="{gif}" alt="gif" width="100">
         <h1 style="margin-left: 10px;">US Flight Patterns From January to August 2023</h1>
     </div>
     """, 
@@ -27,19 +34,12 @@ st.markdown(
 # making a gray horizontal line under my title.
 st.markdown("<hr style='border: 1px solid #f0f0f0;'>", unsafe_allow_html=True)
 
-st.write("Welcome to my Stremlit App! The goal of this app is to help you navigate and understand the overall flight patterns, including those related to departure and arrival cancellations and delays from January to August of 2023. There are two additional pages which can be accessed through the side bar on the left.")
-
+st.write("Welcome to my Stremlit App! The goal of this app is to help you navigate and understand the overall flight patterns, including those related to departure and arrival cancellations and delays from January to August of 2023. There are three additional pages which can be accessed through the side bar on the left.")
 
-# added cache to ensure that the data doesn't have to be reloaded every time the file runs.
-@st.cache_data
-def load_data(csv):
-    return pd.read_csv(csv)
 
-# reading the csv as a pandas daatframe.
-flights_data = load_data("data/flights_sample_3m.csv")
-
-# converting 'FL_DATE' column to datetime.
-flights_data['FL_DATE'] = pd.to_datetime(flights_data['FL_DATE'])
+# the charts below are looked up through flights.query, from the aggregate cube of the flights which is built once and shared
+# by every page and session (or with duckdb over the parquet store), instead of being computed from all of the flights on every rerun.
+# each chart is built by a function which is only called when its figure isn't in flights.figures for the selections it depends on.
 
 
 
@@ -48,66 +48,242 @@ st.header("Flight Trends")
 st.write("The line chart below shows the changes in the total number of flights from aggregated on month specifically from January to August of 2023.")
 st.write("Choose how you want to analyze the monthly trends by selecting either Overall Flight Trends (which shows the flight trends over the year aggregated by months) or Flight Trends by Specific Airlines (which allows you to choose multiple airlines and shows the changes in the total number of flights aggregated by month).")
 
-# extracting month from the 'FL_DATE' column.
-flights_data['Month'] = flights_data['FL_DATE'].dt.month
-# maping months to the numerical values and then ordering it based on the months.
-months = {1: 'January', 2: 'February', 3: 'March', 4: 'April', 5: 'May', 6: 'June', 7: 'July', 8: 'August'}
-flights_data['Month'] = flights_data['Month'].map(months)
-flights_data['Month'] = pd.Categorical(flights_data['Month'], categories=months.values(), ordered=True)
+profile.phase('months', 'compute')
+# maping the months in the data to their names with their year, so that newly added months show up without changing this page.
+months = {month: month_label(month) for month in query.months()}
 
 # radio buttons to select overall or specific airlines.
 choice = st.radio("Select Method of Analysis:", ('Overall Flight Trends', 'Flight Trends by Specific Airline(s)'))
 
 # plotting based on the selected option.
 if choice == 'Overall Flight Trends':
-    # resampling data to get monthly total flights.
-    monthly_flights = flights_data.groupby('Month')['FL_NUMBER'].count().reset_index(name='TotalFlights')
-
-    # plotting and adding tooltip.
-    fig = px.line(monthly_flights, x='Month', y='TotalFlights', markers=True,
-                  labels={'Month': 'Month', 'TotalFlights': 'Total Flights'},
-                  title='Total Number of Flights by Month')
-    fig.update_traces(hovertemplate='<b>Month:</b> %{x}<br><b>Total Flights:</b> %{y:,.0f}')
+    # building the line chart of the total flights of each month.
+    def overall_chart():
+        profile.phase('line chart', 'compute')
+        # looking up the monthly total flights and ordering them based on the months.
+        monthly_flights = query.monthly_flights().reindex(months.keys(), fill_value=0)
+        monthly_flights = monthly_flights.rename(index=months).rename_axis('Month').reset_index(name='TotalFlights')
+
+        profile.phase('line chart', 'figure')
+        # plotting and adding tooltip.
+        fig = px.line(monthly_flights, x='Month', y='TotalFlights', markers=True,
+                      labels={'Month': 'Month', 'TotalFlights': 'Total Flights'},
+                      title='Total Number of Flights by Month')
+        fig.update_traces(hovertemplate='<b>Month:</b> %{x}<br><b>Total Flights:</b> %{y:,.0f}')
+        return fig
+
+    profile.phase('line chart', 'cached')
+    fig = figures.cached('Home', 'monthly flights', (), overall_chart)
+    profile.phase('line chart', 'render')
     st.plotly_chart(fig)
 else: 
     # dropdown box which allows my user to select multiple airlines.
-    selected_airlines = st.multiselect('Select Airlines', flights_data['AIRLINE'].unique())
-
-    # filtering based on selected airlines. 
-    filtered_data = flights_data[flights_data['AIRLINE'].isin(selected_airlines)]
-
-    # resampling data to get monthly total flights.
-    monthly_flights = filtered_data.groupby(['AIRLINE', 'Month'])['FL_NUMBER'].count().reset_index(name='TotalFlights')
-
-    # plotting and adding tooltip.
-    fig1 = px.line(monthly_flights, x='Month', y='TotalFlights', color='AIRLINE', markers=True,
-                labels={'Month': 'Month', 'TotalFlights': 'Total Flights'},
-                title='Total Number of Flights by Month For Selected Airlines',
-                hover_name='AIRLINE')
-    fig1.update_traces(hovertemplate='<b>Month:</b> %{x}<br><b>Total Flights:</b> %{y:,.0f}')
+    selected_airlines = st.multiselect('Select Airlines', query.airlines())
+
+    # building the line chart of the monthly flights of the selected airlines.
+    def airlines_chart():
+        profile.phase('line chart', 'compute')
+        # looking up the monthly total flights of the selected airlines.
+        monthly_flights = query.monthly_flights(selected_airlines).reset_index(name='TotalFlights')
+        monthly_flights = monthly_flights[monthly_flights['Month'].isin(months.keys())]
+        monthly_flights['Month'] = monthly_flights['Month'].map(months)
+
+        profile.phase('line chart', 'figure')
+        # plotting and adding tooltip.
+        fig1 = px.line(monthly_flights, x='Month', y='TotalFlights', color='AIRLINE', markers=True,
+                    labels={'Month': 'Month', 'TotalFlights': 'Total Flights'},
+                    title='Total Number of Flights by Month For Selected Airlines',
+                    hover_name='AIRLINE')
+        fig1.update_traces(hovertemplate='<b>Month:</b> %{x}<br><b>Total Flights:</b> %{y:,.0f}')
+        return fig1
+
+    profile.phase('line chart', 'cached')
+    fig1 = figures.cached('Home', 'airline flights', tuple(selected_airlines), airlines_chart)
+    profile.phase('line chart', 'render')
     st.plotly_chart(fig1)
 
 
 
 # CREATING A FILTER THEN FILTERING THE DATA FOR THE PLOTS BASED ON IT
 st.header("Filter Flight Data by Month(s)")
-selected_month = st.selectbox("Select a Month", ['All','January', 'February', 'March', 'April', 'May', 'June', 'July', 'August'])
+selected_month = st.selectbox("Select a Month", ['All'] + list(months.values()))
 st.markdown("<b>*Note: </b> This selection will be used to filter all the charts below.",unsafe_allow_html=True)
 
-# filtering the data based on the selected month where if its all, then I set it back to the original data which includes all the months, and if a specific month was selected, the data is filtered accordingly for each plot.
+# getting the number of the selected month which is used to look up each plot, where if its all, then no month is used so that all the months are included.
 if selected_month == 'All':
-    selected_month_filtered = flights_data
-    top_airports = flights_data
-    top_airlines = flights_data
-    filtered_status = flights_data
-
+    selected_month_index = None
 else:
-    selected_month_index = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August'].index(selected_month) + 1
-    selected_month_filtered = flights_data[flights_data['FL_DATE'].dt.month == selected_month_index]
-    filtered_status = selected_month_filtered
-    top_airlines = selected_month_filtered
-    filtered_top_airlines =selected_month_filtered 
-    top_airports = flights_data[flights_data['FL_DATE'].dt.month == selected_month_index]
+    selected_month_index = {name: month for month, name in months.items()}[selected_month]
+
+# creating a list of reasons for delay. the reason is picked with the select box at the bottom of the page, but it is read
+# here (the select box keeps it in the session state) so that its chart can be looked up together with the others.
+delay_reasons = ['Carrier Delay', 'Weather Delay', 'NAS Delay', 'Security Delay', 'Late Aircraft Delay']
+selected_reason = st.session_state.get('delay_reason', delay_reasons[0])
+selected_reason_column = {label: column for column, label in DELAY_LABELS.items()}[selected_reason]
+
+
+
+# BUILDING THE CHARTS BELOW
+# building the bar chart of the flights on each day of the week.
+def day_of_week_chart():
+    profile.phase('day of week', 'compute')
+    # looking up the total flights for each day of the week.
+    flights_by_day = query.flights_by_day(selected_month_index).rename_axis('DayOfWeek').reset_index(name='TotalFlights')
+
+    profile.phase('day of week', 'figure')
+    # plotting and adding a tooltip.
+    fig2 = px.bar(flights_by_day, x='DayOfWeek', y='TotalFlights', 
+                 title=f'Total Number of Flights by Day of the Week',
+                 labels={'DayOfWeek': 'Day Of Week', 'TotalFlights': 'Total Flights'})
+    fig2.update_xaxes(categoryorder='array', categoryarray=['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'])
+    fig2.update_traces(hovertemplate='<b>Day of the Week:</b> %{label}<br><b>Total Flights:</b> %{value:,.0f}<extra></extra>', marker_color='#048092')
+    return fig2
+
+# building the treemap of the busiest airports.
+def top_airports_chart():
+    profile.phase('top airports', 'compute')
+    # creating a dataframe with the top 10 busiest airports and putting that into the treemap. 
+    top_airports = query.top_origins(selected_month_index, 10).reset_index()
+    top_airports.columns = ['Airport', 'Number of Flights']
+    # the airport codes are categorical in the store, so turning them back into plain strings for the treemap.
+    top_airports['Airport'] = top_airports['Airport'].astype(str)
+
+    profile.phase('top airports', 'figure')
+    # plotting and adding a tooltip.
+    fig3 = px.treemap(top_airports, path=['Airport'], values='Number of Flights', title=f'Top 10 Busiest Airports',
+                      color='Number of Flights', color_continuous_scale='bluyl')
+    fig3.update_traces(textinfo='label+value', hovertemplate='<b>Airport:</b> %{label}<br><b>Number of Flights:</b> %{value}<extra></extra>')
+    fig3.update_layout(margin=dict(t=50, l=25, r=25, b=25))
+    return fig3
+
+# building the bar chart of the top airlines.
+def top_airlines_chart():
+    profile.phase('top airlines', 'compute')
+    # getting the top 10 airlines for the selected month.
+    top_airlines = query.top_airlines(selected_month_index, 10).reset_index()
+    top_airlines.columns = ['Airlines', 'Number of Flights']
+
+    profile.phase('top airlines', 'figure')
+    # plotting and adding a tool tip.
+    fig4 = px.bar(top_airlines, x='Airlines', y='Number of Flights', 
+                  title=f'Top 10 Airlines by Number of Flights')
+    fig4.update_traces(hovertemplate='<b>Airline:</b> %{x}<br><b>Number of Flights:</b> %{y:,.0f}<extra></extra>', marker_color='#048092')
+    return fig4
+
+# building the donut chart of the flight statuses.
+def flight_status_chart():
+    profile.phase('flight status', 'compute')
+    # counting delayed, diverted and canceled flights for the selected month.
+    status_counts = status.count_statuses(query.status_flights(selected_month_index), status.HOME_STATUSES)
+
+    # creating a data frame for flight status counts.
+    flight_status_counts = pd.DataFrame({'Status': list(status_counts.keys()), 'Count': list(status_counts.values())})
+
+    profile.phase('flight status', 'figure')
+    # plotting and adding a tooltip.
+    fig5 = px.pie(flight_status_counts, values='Count',names='Status', hole=0.5, title=f'Distribution of Flight Status')
+    fig5.update_traces(textinfo='percent+label', hovertemplate='<b>Flight Status:</b> %{label}<br><b>Total Flights:</b> %{value}')
+    return fig5
+
+# building the bar chart of the airports with the most delays of the selected type.
+def delay_type_chart():
+    profile.phase('delay type', 'compute')
+    # looking up the delayed flights by the airport for the selected month and delay reason.
+    delayed_by_airport_month = query.delayed_by_dest(selected_reason_column, selected_month_index).reset_index()
+    delayed_by_airport_month.columns = ['Airport', 'DelayedFlights']
+
+    # sorting and selecting the top 5 airports
+    delayed_by_airport_sorted_selected_month = delayed_by_airport_month.sort_values(by='DelayedFlights', ascending=False)
+    top_5_airports_selected_month = delayed_by_airport_sorted_selected_month.head(5)
+    top_5_airports_sorted_selected_month = top_5_airports_selected_month.sort_values(by='DelayedFlights', ascending=True)
+
+    profile.phase('delay type', 'figure')
+    # make the horizontal bar chart for the top 5 airports with a tooltip.
+    fig6 = px.bar(top_5_airports_sorted_selected_month, y='Airport', x='DelayedFlights',
+                 title=f'Top 5 Airports with the Highest Number of Delayed Flights due to {selected_reason}',
+                 labels={'Airport': 'Airport Code', 'DelayedFlights': 'Number of Delayed Flights'},
+                 orientation='h')
+    fig6.update_traces(hovertemplate='<b>Airport:</b> %{y}<br><b>Number of Delayed Flights:</b> %{x:,.0f}<extra></extra>', marker_color='#048092')
+    return fig6
+
+# none of the charts below depend on each other, so they are looked up at the same time by the threads of flights.sections
+# and then shown one after another in the order of the page.
+charts = {
+    'day of week': sections.submit(figures.cached, 'Home', 'day of week', selected_month_index, day_of_week_chart),
+    'top airports': sections.submit(figures.cached, 'Home', 'top airports', selected_month_index, top_airports_chart),
+    'top airlines': sections.submit(figures.cached, 'Home', 'top airlines', selected_month_index, top_airlines_chart),
+    'flight status': sections.submit(figures.cached, 'Home', 'flight status', selected_month_index, flight_status_chart),
+    'delay type': sections.submit(figures.cached, 'Home', 'delay type', (selected_reason, selected_month_index), delay_type_chart),
+}
+
+# in the approximate mode (FLIGHTS_PREVIEW=1) a chart which isn't ready yet is first shown as an estimate from the sample of
+# the flights (see flights.sample) with the 95% confidence interval of each value, and once every chart or preview is shown
+# the exact charts take the place of the previews. preview_sample is None when the mode is off.
+preview_sample = query.preview_sample()
+previews = []
+
+
+# showing the chart of a section, or a preview of it built with build_preview when it isn't ready yet.
+def show_chart(section, build_preview):
+    if preview_sample is None or charts[section].done():
+        profile.phase(section, 'cached')
+        fig = charts[section].result()
+        profile.phase(section, 'render')
+        st.plotly_chart(fig)
+        return
+
+    profile.phase(section, 'preview')
+    placeholder = st.empty()
+    with placeholder.container():
+        st.plotly_chart(build_preview())
+        st.caption(f"*Estimated from a sample of {len(preview_sample):,} flights while the exact chart is being looked up, with the 95% confidence interval of each value.*")
+    previews.append((section, placeholder))
+
+
+# the previews of the charts, which are built the same way as the charts but from the estimates of the sample.
+def day_of_week_preview():
+    flights_by_day = sample.flights_by_day(preview_sample, selected_month_index).rename_axis('DayOfWeek').reset_index()
+    fig = px.bar(flights_by_day, x='DayOfWeek', y='Flights', error_y='Margin', custom_data=['Margin'],
+                 title=f'Estimated Number of Flights by Day of the Week',
+                 labels={'DayOfWeek': 'Day Of Week', 'Flights': 'Total Flights'})
+    fig.update_xaxes(categoryorder='array', categoryarray=['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'])
+    fig.update_traces(hovertemplate='<b>Day of the Week:</b> %{x}<br><b>Total Flights:</b> %{y:,.0f} ± %{customdata[0]:,.0f}<extra></extra>', marker_color='#048092')
+    return fig
+
+def top_airports_preview():
+    top_airports = sample.top_origins(preview_sample, selected_month_index, 10).rename_axis('Airport').reset_index()
+    top_airports['Airport'] = top_airports['Airport'].astype(str)
+    fig = px.treemap(top_airports, path=['Airport'], values='Flights', custom_data=['Margin'], title=f'Estimated Top 10 Busiest Airports',
+                     color='Flights', color_continuous_scale='bluyl')
+    fig.update_traces(texttemplate='%{label}<br>%{value:,.0f}', hovertemplate='<b>Airport:</b> %{label}<br><b>Number of Flights:</b> %{value:,.0f} ± %{customdata[0]:,.0f}<extra></extra>')
+    fig.update_layout(margin=dict(t=50, l=25, r=25, b=25))
+    return fig
+
+def top_airlines_preview():
+    top_airlines = sample.top_airlines(preview_sample, selected_month_index, 10).rename_axis('Airlines').reset_index()
+    fig = px.bar(top_airlines, x='Airlines', y='Flights', error_y='Margin', custom_data=['Margin'],
+                 title=f'Estimated Top 10 Airlines by Number of Flights', labels={'Flights': 'Number of Flights'})
+    fig.update_traces(hovertemplate='<b>Airline:</b> %{x}<br><b>Number of Flights:</b> %{y:,.0f} ± %{customdata[0]:,.0f}<extra></extra>', marker_color='#048092')
+    return fig
+
+def flight_status_preview():
+    flight_status_counts = sample.status_flights(preview_sample, status.HOME_STATUSES, selected_month_index).rename_axis('Status').reset_index()
+    # the margin of each status in percentage points of all the flights in the chart.
+    flight_status_counts['PercentMargin'] = flight_status_counts['Margin'] / flight_status_counts['Flights'].sum() * 100
+    fig = px.pie(flight_status_counts, values='Flights', names='Status', hole=0.5, custom_data=['PercentMargin'],
+                 title=f'Estimated Distribution of Flight Status')
+    fig.update_traces(textinfo='percent+label', hovertemplate='<b>Flight Status:</b> %{label}<br><b>Percent of Flights:</b> %{percent} ± %{customdata[0]:.1f}%<extra></extra>')
+    return fig
+
+def delay_type_preview():
+    delayed_by_airport = sample.delayed_by_dest(preview_sample, selected_reason_column, selected_month_index)
+    top_5_airports = delayed_by_airport.nlargest(5, 'Flights').sort_values(by='Flights').rename_axis('Airport').reset_index()
+    top_5_airports['Airport'] = top_5_airports['Airport'].astype(str)
+    fig = px.bar(top_5_airports, y='Airport', x='Flights', error_x='Margin', custom_data=['Margin'], orientation='h',
+                 title=f'Estimated Top 5 Airports with the Highest Number of Delayed Flights due to {selected_reason}',
+                 labels={'Airport': 'Airport Code', 'Flights': 'Number of Delayed Flights'})
+    fig.update_traces(hovertemplate='<b>Airport:</b> %{y}<br><b>Number of Delayed Flights:</b> %{x:,.0f} ± %{customdata[0]:,.0f}<extra></extra>', marker_color='#048092')
+    return fig
 
 
 
@@ -119,17 +295,7 @@ else:
 
 st.write("The bar chart below shows the total number of flights scheduled for each day of the week based on the selected month(s) of 2023.")
 
-# extracting day of the week information and then grouping the data by it and total flights.
-selected_month_filtered['DayOfWeek'] = selected_month_filtered['FL_DATE'].dt.day_name()
-flights_by_day = selected_month_filtered.groupby('DayOfWeek')['FL_NUMBER'].count().reset_index(name='TotalFlights')
-
-# plotting and adding a tooltip.
-fig2 = px.bar(flights_by_day, x='DayOfWeek', y='TotalFlights', 
-             title=f'Total Number of Flights by Day of the Week',
-             labels={'DayOfWeek': 'Day Of Week', 'TotalFlights': 'Total Flights'})
-fig2.update_xaxes(categoryorder='array', categoryarray=['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'])
-fig2.update_traces(hovertemplate='<b>Day of the Week:</b> %{label}<br><b>Total Flights:</b> %{value:,.0f}<extra></extra>', marker_color='#048092')
-st.plotly_chart(fig2)
+show_chart('day of week', day_of_week_preview)
 
 
 
@@ -141,16 +307,7 @@ else:
 
 st.write("The tree map below shows the top 10 busiest airports based on the previously selected month(s) of 2023.")
 
-# creating a dataframe with the top 10 busiest airports and putting that into the treemap. 
-top_airports = top_airports['ORIGIN'].value_counts().nlargest(10).reset_index()
-top_airports.columns = ['Airport', 'Number of Flights']
-
-# plotting and adding a tooltip.
-fig3 = px.treemap(top_airports, path=['Airport'], values='Number of Flights', title=f'Top 10 Busiest Airports',
-                  color='Number of Flights', color_continuous_scale='bluyl')
-fig3.update_traces(textinfo='label+value', hovertemplate='<b>Airport:</b> %{label}<br><b>Number of Flights:</b> %{value}<extra></extra>')
-fig3.update_layout(margin=dict(t=50, l=25, r=25, b=25))
-st.plotly_chart(fig3)
+show_chart('top airports', top_airports_preview)
 
 
 
@@ -162,15 +319,7 @@ else:
 
 st.write("The bar chart below shows the top 10 airlines based on the number of flights for the the previously selected month(s) of 2023.")
 
-# getting the top 10 airlines for the selected month.
-top_airlines = top_airlines.groupby('AIRLINE')['FL_NUMBER'].count().nlargest(10).reset_index()
-top_airlines.columns = ['Airlines', 'Number of Flights']
-
-# plotting and adding a tool tip.
-fig4 = px.bar(top_airlines, x='Airlines', y='Number of Flights', 
-              title=f'Top 10 Airlines by Number of Flights')
-fig4.update_traces(hovertemplate='<b>Airline:</b> %{x}<br><b>Number of Flights:</b> %{y:,.0f}<extra></extra>', marker_color='#048092')
-st.plotly_chart(fig4)
+show_chart('top airlines', top_airlines_preview)
 
 
 
@@ -182,19 +331,7 @@ else:
 
 st.write("The donut chart below shows the distribution in percentage of the flights that were on time, delayed, cancelled, or diverted for the previously selected month(s) of 2023.")
 
-# counting delayed, diverted and canceled flights for the selected month.
-delayed = len(filtered_status[filtered_status['ARR_DELAY'] > 0])
-diverted = len(filtered_status[filtered_status['DIVERTED'] == 1])
-cancelled = len(filtered_status[filtered_status['CANCELLED'] == 1])
-ontime = len(filtered_status[(filtered_status['ARR_DELAY'] <= 0) & (filtered_status['DIVERTED'] == 0) & (filtered_status['CANCELLED'] == 0)])
-
-# creating a data frame for flight status counts.
-flight_status_counts = pd.DataFrame({'Status': ['Delayed', 'Diverted', 'Cancelled', 'On-time'],'Count': [delayed, diverted, cancelled, ontime]})
-
-# plotting and adding a tooltip.
-fig5 = px.pie(flight_status_counts, values='Count',names='Status', hole=0.5, title=f'Distribution of Flight Status')
-fig5.update_traces(textinfo='percent+label', hovertemplate='<b>Flight Status:</b> %{label}<br><b>Total Flights:</b> %{value}')
-st.plotly_chart(fig5)
+show_chart('flight status', flight_status_preview)
 
 
 
@@ -213,42 +350,16 @@ st.write("3. NAS Delay ✈ Delay by National Aviation System (NAS) caused due to
 st.write("4. Security Delay ✈ Delay caused by security related issues, such as terminal evacuations, aircraft re-boarding due to security breaches, malfunctioning screening equipment, or long queues exceeding 29 minutes at screening areas.")
 st.write("5. Late Aircraft Delay ✈ Delay due to delayed aircrafts.")
 
-# renaming my columns for clarity and to increase the readability in my plot.
-flights_data.rename(columns={'DELAY_DUE_CARRIER': 'Carrier Delay', 'DELAY_DUE_WEATHER': 'Weather Delay',
-                             'DELAY_DUE_NAS': 'NAS Delay', 'DELAY_DUE_SECURITY': 'Security Delay', 
-                             'DELAY_DUE_LATE_AIRCRAFT': 'Late Aircraft Delay'}, inplace=True)
+# adding a select box to choose the reason for delay from the list.
+selected_reason = st.selectbox("Select Reason for Delay:", delay_reasons, key='delay_reason')
 
-# filtering delayed flights. 
-delayed_flights = flights_data[flights_data['ARR_DELAY'] > 0]
+show_chart('delay type', delay_type_preview)
 
-# once again filtering delayed_flights data for the selected month.
-if selected_month == 'All':
-    delayed_flights_selected_month = delayed_flights
-else:
-    selected_month_index = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August'].index(selected_month) + 1
-    delayed_flights_selected_month = delayed_flights[delayed_flights['FL_DATE'].dt.month == selected_month_index]
+# swapping the exact charts in for the previews, in the order of the page.
+for section, placeholder in previews:
+    profile.phase(section, 'cached')
+    fig = charts[section].result()
+    profile.phase(section, 'render')
+    placeholder.plotly_chart(fig)
 
-# creating a list of reasons for delay and then add a select box to choose from the list.
-delay_reasons = ['Carrier Delay', 'Weather Delay', 'NAS Delay', 'Security Delay', 'Late Aircraft Delay']
-selected_reason = st.selectbox("Select Reason for Delay:", delay_reasons)
-
-# filtering the data based on selected delay reason.
-if selected_reason != 'Late Aircraft Delay':  
-    delayed_flights_selected_month = delayed_flights_selected_month[delayed_flights_selected_month[selected_reason] > 0]
-
-# counting delayed flights by the airport.
-delayed_by_airport_month = delayed_flights_selected_month.groupby('DEST')['FL_NUMBER'].count().reset_index()
-delayed_by_airport_month.columns = ['Airport', 'DelayedFlights']
-
-# sorting and selecting the top 5 airports
-delayed_by_airport_sorted_selected_month = delayed_by_airport_month.sort_values(by='DelayedFlights', ascending=False)
-top_5_airports_selected_month = delayed_by_airport_sorted_selected_month.head(5)
-top_5_airports_sorted_selected_month = top_5_airports_selected_month.sort_values(by='DelayedFlights', ascending=True)
-
-# make the horizontal bar chart for the top 5 airports with a tooltip.
-fig6 = px.bar(top_5_airports_sorted_selected_month, y='Airport', x='DelayedFlights',
-             title=f'Top 5 Airports with the Highest Number of Delayed Flights due to {selected_reason}',
-             labels={'Airport': 'Airport Code', 'DelayedFlights': 'Number of Delayed Flights'},
-             orientation='h')
-fig6.update_traces(hovertemplate='<b>Airport:</b> %{y}<br><b>Number of Delayed Flights:</b> %{x:,.0f}<extra></extra>', marker_color='#048092')
-st.plotly_chart(fig6)
+profile.finish()
@@ -0,0 +1 @@
+# shared data helpers used by the Home, Departures and Arrivals pages.
@@ -0,0 +1,114 @@
+import argparse
+import os
+
+import pandas as pd
+
+from flights.cube import CUBE_PATH, build_cube, load_cube, load_manifest, merge_cubes, save_cube
+from flights.index import INDEX_DIR, append_index, build_index, load_index, save_index
+from flights.precompute import DRILLDOWN_DIR, append_drilldowns
+from flights.routes import ROUTES_PATH, build_routes, load_routes, merge_routes, save_routes
+from flights.sample import SAMPLE_PATH, append_sample, load_sample, save_sample
+from flights.sketches import DELAYS, SKETCH_DIR, build_sketches, load_sketches, merge_sketches, save_sketches
+from flights.store import (ARROW_PATH, STORE_DIR, partition_keys, read_csv, read_store, store_exists, store_fingerprint,
+                           store_months, store_rows, write_arrow, write_partition)
+
+
+# adding the flights of one or more new months to the store, the cube and the indexes without rebuilding them from
+# the whole history. months which are already in the cube's manifest (or the store) are refused, since their flights would
+# be counted twice. returns the added months and the paths which were written.
+def append_months(csv, store_dir=STORE_DIR, cube_path=CUBE_PATH, index_dir=INDEX_DIR, arrow_path=ARROW_PATH,
+                  drilldown_dir=DRILLDOWN_DIR, routes_path=ROUTES_PATH, sketch_dir=SKETCH_DIR, sample_path=SAMPLE_PATH):
+    frame = read_csv(csv)
+    keys = partition_keys(frame)
+    months = sorted(keys.unique())
+    existing = store_months(store_dir)
+    duplicates = sorted(set(months) & (set(existing) | set(load_manifest(cube_path))))
+    if duplicates:
+        raise ValueError(f"{', '.join(duplicates)} already added, rebuild the data with: python -m flights.ingest")
+
+    # the new flights in the order the pages will read them from the store, which is month by month.
+    frame = pd.concat([month_frame for _, month_frame in frame.groupby(keys, sort=True)], ignore_index=True)
+
+    # the cube only needs the aggregates of the new flights added to it.
+    aggregates = load_cube(cube_path)
+    aggregates = build_cube(frame) if aggregates is None else merge_cubes([aggregates, build_cube(frame)])
+    # and so does the route matrix.
+    route_entries = load_routes(routes_path)
+    route_entries = build_routes(frame) if route_entries is None else merge_routes([route_entries, build_routes(frame)])
+    # the delay sketches of the new months are merged into the stored ones, which gives the same percentiles as building
+    # them from all the flights again.
+    delay_sketches = {side: merge_sketches([load_sketches(side, sketch_dir), build_sketches(frame, side)], side)
+                      for side in DELAYS}
+
+    save_routes(route_entries, routes_path)
+    for side, side_sketches in delay_sketches.items():
+        save_sketches(side_sketches, side, sketch_dir)
+    written = [routes_path, sketch_dir]
+    # the sample is stratified by month, so the new months are sampled at the same rate and added to it.
+    flights_sample = load_sample(sample_path)
+    if flights_sample is not None:
+        save_sample(append_sample(flights_sample, frame), sample_path)
+        written.append(sample_path)
+
+    # without a store (when running on the cube alone) there is nothing else to update.
+    if store_exists(store_dir):
+        written += append_store(frame, months, existing, store_dir, index_dir, arrow_path, drilldown_dir)
+    # the cube is written last, since its manifest records the months as added.
+    save_cube(aggregates, cube_path)
+    return months, [cube_path] + written
+
+
+# adding the new months to the store and updating the indexes, the arrow file and the drill-downs which were built from it,
+# where existing are the months the store had. returns the paths which were written.
+def append_store(frame, months, existing, store_dir, index_dir, arrow_path, drilldown_dir):
+    n_rows = store_rows(store_dir)
+    fingerprint = store_fingerprint(store_dir)
+    for month, month_frame in frame.groupby(partition_keys(frame), sort=True):
+        write_partition(month_frame, month, store_dir)
+    written = [store_dir, index_dir]
+
+    # the indexes can be extended when the new months come after all the stored ones, since the new flights are then
+    # read after the old ones. otherwise the row positions move and the indexes are built again from the store.
+    for side in ['ORIGIN', 'DEST']:
+        airport_index = load_index(side, n_rows, index_dir)
+        if airport_index is not None and (not existing or months[0] > existing[-1]):
+            airport_index = append_index(airport_index, frame, n_rows)
+        else:
+            airport_index = build_index(read_store(store_dir, ['ORIGIN', 'DEST', 'AIRLINE']), side)
+        save_index(airport_index, index_dir)
+
+    # the arrow file of the mmap data mode holds every column in one chunk, so it is written again from the store.
+    if os.path.exists(arrow_path):
+        write_arrow(read_store(store_dir), arrow_path)
+        written.append(arrow_path)
+    # the precomputed drill-downs only need the counts of the new months added to them.
+    if os.path.isdir(drilldown_dir):
+        append_drilldowns(months, fingerprint, store_dir, drilldown_dir)
+        written.append(drilldown_dir)
+    return written
+
+
+# command line entry point for adding a new month of flights, run with: python -m flights.append <csv>
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Add the flights of new months to the store, cube and indexes.")
+    parser.add_argument("csv", help="path to the csv with the flights of the new month(s)")
+    parser.add_argument("--store", default=STORE_DIR, help="directory of the store to add the months to")
+    parser.add_argument("--cube", default=CUBE_PATH, help="path of the aggregate cube to update")
+    parser.add_argument("--index", default=INDEX_DIR, help="directory of the airport/airline indexes to update")
+    parser.add_argument("--arrow", default=ARROW_PATH, help="path of the arrow file of the mmap data mode to update")
+    parser.add_argument("--drilldowns", default=DRILLDOWN_DIR, help="directory of the precomputed drill-downs to update")
+    parser.add_argument("--routes", default=ROUTES_PATH, help="path of the route matrix to update")
+    parser.add_argument("--sketches", default=SKETCH_DIR, help="directory of the delay percentile sketches to update")
+    parser.add_argument("--sample", default=SAMPLE_PATH, help="path of the sample of the flights to update")
+    args = parser.parse_args(argv)
+
+    try:
+        months, written = append_months(args.csv, args.store, args.cube, args.index, args.arrow, args.drilldowns, args.routes,
+                               args.sketches, args.sample)
+    except ValueError as error:
+        parser.error(str(error))
+    print(f"added {', '.join(months)} to {', '.join(written)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+import base64
+import hashlib
+import os
+
+import streamlit as st
+
+# the header gifs of the pages, which streamlit serves at app/static/ when static serving is turned on in .streamlit/config.toml.
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+
+
+# the url of a static image. the version of the file is added to the url, which makes tornado send it with a long cache
+# lifetime, so every browser downloads it once and a changed image gets a new url. without static serving, the image is
+# inlined as base64 which is encoded once per process instead of on every rerun.
+@st.cache_resource
+def image_url(name):
+    with open(os.path.join(STATIC_DIR, name), "rb") as f:
+        image = f.read()
+    if st.get_option("server.enableStaticServing"):
+        return f"app/static/{name}?v={hashlib.md5(image).hexdigest()[:12]}"
+    return f"data:image/{os.path.splitext(name)[1][1:]};base64,{base64.b64encode(image).decode()}"
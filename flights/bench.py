@@ -0,0 +1,121 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIZES = [1_000_000, 3_000_000, 10_000_000, 30_000_000]
+
+
+# peak resident memory of this process in MB (linux reports ru_maxrss in KB).
+def peak_rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# the widget interactions of each page, as (name, action) pairs which are applied to the AppTest in order. the
+# options are looked up when the action runs, since some widgets only appear after an earlier interaction.
+def home_interactions(at):
+    return ([("month", lambda at: at.selectbox[0].select(at.selectbox[0].options[min(3, len(at.selectbox[0].options) - 1)]))]
+            + [(f"reason {reason}", lambda at, reason=reason: at.selectbox[1].select(reason))
+               for reason in at.selectbox[1].options[1:]]
+            + [("month All", lambda at: at.selectbox[0].select('All')),
+               ("airlines trend", lambda at: at.radio[0].set_value(at.radio[0].options[1])),
+               ("pick airlines", lambda at: at.multiselect[0].select(at.multiselect[0].options[0])
+                                                              .select(at.multiselect[0].options[1]))])
+
+
+def drilldown_interactions(at):
+    return ([(f"airport {airport}", lambda at, airport=airport: at.selectbox[0].select(airport))
+             for airport in at.selectbox[0].options[1:4]]
+            + [("airline", lambda at: at.selectbox[1].select(at.selectbox[1].options[-1]))])
+
+
+def routes_interactions(at):
+    return [("month", lambda at: at.selectbox[0].select(at.selectbox[0].options[1])),
+            ("airline", lambda at: at.selectbox[1].select(at.selectbox[1].options[1])),
+            ("top 30", lambda at: at.slider[0].set_value(30)),
+            ("airport", lambda at: at.selectbox[2].select(at.selectbox[2].options[-1]))]
+
+
+PAGES = [("Home.py", home_interactions), ("pages/1_Departures.py", drilldown_interactions),
+         ("pages/2_Arrivals.py", drilldown_interactions), ("pages/3_Routes.py", routes_interactions)]
+
+
+# running every page headlessly against the data in the current directory and timing the first run (the cold
+# load) and every interaction after it. all pages run in one process so they share the cached data like a server.
+def bench_pages():
+    from streamlit.testing.v1 import AppTest
+
+    results = []
+    for page, interactions in PAGES:
+        at = AppTest.from_file(os.path.join(ROOT, page), default_timeout=3600)
+        started = time.perf_counter()
+        at.run()
+        results.append({'page': page, 'interaction': 'load', 'seconds': time.perf_counter() - started,
+                        'peak_rss_mb': peak_rss()})
+        if at.exception:
+            raise RuntimeError(f"{page} failed: {at.exception[0].value}")
+        for name, action in interactions(at):
+            action(at)
+            started = time.perf_counter()
+            at.run()
+            if at.exception:
+                raise RuntimeError(f"{page} failed after {name}: {at.exception[0].value}")
+            results.append({'page': page, 'interaction': name, 'seconds': time.perf_counter() - started,
+                            'peak_rss_mb': peak_rss()})
+    return results
+
+
+# benchmarking one dataset size in a fresh process, so the cold load and the peak memory aren't carried over from
+# the previous size. the synthetic csv (and the store when ingest is set) is kept in workdir/<rows> for the next run.
+def bench_size(rows, workdir, ingest, seed=0):
+    from flights.synthetic import write_csv
+
+    size_dir = os.path.join(workdir, str(rows))
+    csv = os.path.join(size_dir, "data", "flights_sample_3m.csv")
+    if not os.path.exists(csv):
+        os.makedirs(os.path.dirname(csv), exist_ok=True)
+        write_csv(csv, rows, seed)
+
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')])))
+    if ingest and not os.path.isdir(os.path.join(size_dir, "data", "flights_store")):
+        subprocess.run([sys.executable, "-m", "flights.ingest"], cwd=size_dir, env=env, check=True,
+                       stdout=subprocess.DEVNULL)
+    output = subprocess.run([sys.executable, "-m", "flights.bench", "--pages"], cwd=size_dir, env=env, check=True,
+                            stdout=subprocess.PIPE, text=True).stdout
+    return [dict(result, rows=rows, ingested=ingest) for result in json.loads(output)]
+
+
+# command line entry point for the benchmark, run with: python -m flights.bench --rows 1000000 3000000
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pages headlessly on synthetic flights data.")
+    parser.add_argument("--rows", type=int, nargs="+", default=SIZES, help="dataset sizes to benchmark")
+    parser.add_argument("--workdir", default="bench", help="directory to keep the synthetic datasets in")
+    parser.add_argument("--ingest", action="store_true", help="build the parquet store, cube and indexes first")
+    parser.add_argument("--output", help="path to write the json results to, printed when not given")
+    parser.add_argument("--pages", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    # the child process which times the pages on the data in its working directory.
+    if args.pages:
+        print(json.dumps(bench_pages()))
+        return
+
+    results = []
+    for rows in args.rows:
+        results.extend(bench_size(rows, args.workdir, args.ingest))
+        load = sum(result['seconds'] for result in results if result['rows'] == rows and result['interaction'] == 'load')
+        print(f"{rows:,} flights: pages loaded in {load:.2f}s", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=1)
+    else:
+        print(json.dumps(results, indent=1))
+
+
+if __name__ == "__main__":
+    main()
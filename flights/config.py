@@ -0,0 +1,27 @@
+import os
+
+# where the pages get their flights from. with "rows" the flights are loaded into memory (from the store, or the csv if the
+# store hasn't been built), with "mmap" the arrow file written by the ingest is mapped into memory and shared by every
+# streamlit process on the machine, and with "aggregates" only the cube written by `python -m flights.stream` is read,
+# which is used for datasets that are too big to load, such as the full 2019-2023 history.
+DATA_MODE = os.environ.get("FLIGHTS_DATA_MODE", "rows")
+
+# which engine answers the pages' queries. "pandas" looks them up in the cube and the airport index (or the flights in memory),
+# and "duckdb" runs them as sql straight over the parquet store, see flights.sql.
+BACKEND = os.environ.get("FLIGHTS_BACKEND", "pandas")
+
+# set FLIGHTS_PROFILE=1 to time every chart section of the pages, see flights.profile. the timings are shown in a sidebar
+# panel and appended as one json line per rerun to the trace log.
+PROFILE = os.environ.get("FLIGHTS_PROFILE", "") not in ("", "0")
+TRACE_LOG = os.environ.get("FLIGHTS_TRACE_LOG", "logs/flights_trace.jsonl")
+
+# how many MB of plotly figures flights.figures keeps for reuse across reruns and sessions, 0 turns the figure cache off.
+FIGURE_CACHE_MB = float(os.environ.get("FLIGHTS_FIGURE_CACHE_MB", "64"))
+
+# how many threads compute the independent chart sections of the Home page at the same time, see flights.sections.
+# 0 computes them one after another while the page is shown, which is easier to debug.
+SECTION_WORKERS = int(os.environ.get("FLIGHTS_SECTION_WORKERS", "4"))
+
+# set FLIGHTS_PREVIEW=1 for the approximate mode of the Home page, where a chart which isn't ready yet is first shown as an
+# estimate from the sample of the flights written by the ingest (see flights.sample) and then replaced by the exact chart.
+PREVIEW = os.environ.get("FLIGHTS_PREVIEW", "") not in ("", "0")
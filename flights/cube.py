@@ -0,0 +1,215 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from flights import profile, status
+from flights.derive import add_derived_columns
+from flights.store import partition_key
+
+CUBE_PATH = "data/flights_cube.parquet"
+
+# every key of the cube. Month is the year and month (for example 202301, see flights.derive), DayOfWeek goes from 0 (Monday) to 6 (Sunday), DepHour and ArrHour
+# are the scheduled hours, Status is the packed status code and DelayCause the delay cause mask from flights.status.
+KEYS = ['Month', 'AIRLINE', 'ORIGIN', 'DEST', 'DayOfWeek', 'DepHour', 'ArrHour', 'Status', 'DelayCause']
+INTEGER_KEYS = ['Month', 'DayOfWeek', 'DepHour', 'ArrHour', 'Status', 'DelayCause']
+# the integer keys are small, apart from Month which holds the year.
+KEY_TYPES = {**{key: 'int8' for key in INTEGER_KEYS}, 'Month': 'int32'}
+
+# besides the number of flights and their delay minutes, the minutes of each delay type and the number of flights which
+# reported them are kept so that the average delay of each type can be worked out from the cube.
+CAUSE_MINUTES = {column: f"{column}_MINUTES" for column in status.DELAY_COLUMNS}
+CAUSE_REPORTS = {column: f"{column}_REPORTS" for column in status.DELAY_COLUMNS}
+MEASURES = ['Flights', 'DepDelayMinutes', 'ArrDelayMinutes'] + list(CAUSE_MINUTES.values()) + list(CAUSE_REPORTS.values())
+
+# the grouping sets which are stored in the cube, one for each kind of chart on the Home page and on the Departures (dep_*)
+# and Arrivals (arr_*) pages. the keys which are not part of a grouping set are left empty for its rows.
+GROUPING_SETS = {
+    'airline': ['Month', 'AIRLINE'],
+    'day': ['Month', 'DayOfWeek'],
+    'origin': ['Month', 'ORIGIN'],
+    'status': ['Month', 'Status'],
+    'delay': ['Month', 'DEST', 'Status', 'DelayCause'],
+    'dep_hour': ['ORIGIN', 'AIRLINE', 'DepHour'],
+    'dep_status': ['ORIGIN', 'AIRLINE', 'Status', 'DelayCause'],
+    'arr_hour': ['DEST', 'AIRLINE', 'ArrHour'],
+    'arr_status': ['DEST', 'AIRLINE', 'Status', 'DelayCause'],
+}
+
+# the grouping sets of the Departures (ORIGIN) and Arrivals (DEST) pages.
+DRILLDOWN_SETS = {'ORIGIN': ('dep_hour', 'dep_status'), 'DEST': ('arr_hour', 'arr_status')}
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+# adding the cube keys and measures to the flights, without changing the given frame.
+def cube_columns(frame):
+    frame = add_derived_columns(frame, ['Month', 'DayOfWeek', 'DepHour', 'ArrHour', 'Status', 'DelayCause'])
+    columns = pd.DataFrame({
+        'Month': frame['Month'],
+        'AIRLINE': frame['AIRLINE'],
+        'ORIGIN': frame['ORIGIN'],
+        'DEST': frame['DEST'],
+        'DayOfWeek': frame['DayOfWeek'],
+        'DepHour': frame['DepHour'],
+        'ArrHour': frame['ArrHour'],
+        'Status': frame['Status'],
+        'DelayCause': frame['DelayCause'],
+        'Flights': 1,
+        'DepDelayMinutes': frame['DEP_DELAY'].fillna(0).astype('int64'),
+        'ArrDelayMinutes': frame['ARR_DELAY'].fillna(0).astype('int64'),
+    }, index=frame.index)
+    for column in status.DELAY_COLUMNS:
+        columns[CAUSE_MINUTES[column]] = frame[column].fillna(0).astype('int64')
+        columns[CAUSE_REPORTS[column]] = frame[column].notna().astype('int64')
+    return columns
+
+
+# aggregating the flights once for every grouping set and stacking the results into one long frame.
+def build_cube(frame):
+    columns = cube_columns(frame)
+    parts = []
+    for grouping, keys in GROUPING_SETS.items():
+        part = columns.groupby(keys, observed=True)[MEASURES].sum().reset_index()
+        parts.append(part.assign(Grouping=grouping))
+    return compact(pd.concat(parts, ignore_index=True))
+
+
+# putting the cube columns in order and giving the keys their compact types.
+def compact(cube):
+    return cube[['Grouping'] + KEYS + MEASURES].astype({
+        'Grouping': 'category', 'AIRLINE': 'category', 'ORIGIN': 'category', 'DEST': 'category',
+        **{key: dtype.capitalize() for key, dtype in KEY_TYPES.items()}})
+
+
+# adding up cubes which were built from different flights (for example from the chunks of a csv which is too big to load),
+# which gives the same cube as building it from all of those flights at once.
+def merge_cubes(cubes):
+    stacked = pd.concat([cube for cube in cubes if cube is not None], ignore_index=True)
+    # the airline and airport categories differ between the cubes, so they are merged as plain values.
+    stacked = stacked.astype({'Grouping': 'object', 'AIRLINE': 'object', 'ORIGIN': 'object', 'DEST': 'object'})
+    merged = stacked.groupby(['Grouping'] + KEYS, dropna=False)[MEASURES].sum().reset_index()
+    return compact(merged)
+
+
+def save_cube(cube, path=CUBE_PATH):
+    cube.to_parquet(path, index=False)
+    save_manifest(cube, path)
+
+
+def load_cube(path=CUBE_PATH):
+    return pd.read_parquet(path) if os.path.exists(path) else None
+
+
+# the rows of a single grouping set, optionally only for one month.
+def cube_slice(cube, grouping, month=None):
+    profile.scanned(len(cube))
+    rows = cube[cube['Grouping'] == grouping]
+    if month is not None:
+        rows = rows[rows['Month'] == month]
+    rows = rows[GROUPING_SETS[grouping] + MEASURES]
+    # the integer keys of a grouping set are never empty, so they can go back to plain integers.
+    return rows.astype({key: KEY_TYPES[key] for key in GROUPING_SETS[grouping] if key in INTEGER_KEYS})
+
+
+# the months (YYYY-MM) whose flights are in a saved cube are listed in a manifest next to it, which is written with the
+# cube, so that flights.append can refuse to add a month twice whether or not there is a store.
+def manifest_path(path=CUBE_PATH):
+    return f"{os.path.splitext(path)[0]}_months.json"
+
+
+def save_manifest(cube, path=CUBE_PATH):
+    with open(manifest_path(path), "w") as manifest:
+        json.dump([partition_key(month) for month in months(cube)], manifest)
+
+
+# the months in the manifest of a saved cube. a cube saved before it had a manifest has its months read from the cube.
+def load_manifest(path=CUBE_PATH):
+    if os.path.exists(manifest_path(path)):
+        with open(manifest_path(path)) as manifest:
+            return json.load(manifest)
+    saved = load_cube(path)
+    return [] if saved is None else [partition_key(month) for month in months(saved)]
+
+
+# sorted list of the months in the cube.
+def months(cube):
+    return sorted(int(month) for month in cube_slice(cube, 'airline')['Month'].unique())
+
+
+# sorted list of the airlines in the cube.
+def airlines(cube):
+    return sorted(cube_slice(cube, 'airline')['AIRLINE'].unique())
+
+
+# total flights per month, optionally per airline for the given airlines.
+def monthly_flights(cube, airlines=None):
+    rows = cube_slice(cube, 'airline')
+    if airlines is None:
+        return rows.groupby('Month')['Flights'].sum()
+    rows = rows[rows['AIRLINE'].isin(airlines)]
+    return rows.groupby(['AIRLINE', 'Month'], observed=True)['Flights'].sum()
+
+
+# total flights per day of the week, indexed by the day name from Monday to Sunday.
+def flights_by_day(cube, month=None):
+    counts = cube_slice(cube, 'day', month).groupby('DayOfWeek')['Flights'].sum()
+    return counts.rename(index=dict(enumerate(DAY_NAMES)))
+
+
+def top_origins(cube, month=None, n=10):
+    return cube_slice(cube, 'origin', month).groupby('ORIGIN', observed=True)['Flights'].sum().nlargest(n)
+
+
+def top_airlines(cube, month=None, n=10):
+    return cube_slice(cube, 'airline', month).groupby('AIRLINE', observed=True)['Flights'].sum().nlargest(n)
+
+
+# number of flights per status code, as an array indexed by the code.
+def status_flights(cube, month=None):
+    rows = cube_slice(cube, 'status', month)
+    return np.bincount(rows['Status'], weights=rows['Flights'], minlength=status.STATUS_CODES).astype('int64')
+
+
+# number of delayed arrivals per destination airport caused by the given delay column. the late aircraft delay keeps
+# counting every delayed arrival, which is how the Home page has always shown it.
+def delayed_by_dest(cube, delay_column, month=None):
+    rows = cube_slice(cube, 'delay', month)
+    rows = rows[(rows['Status'] & status.ARR_DELAYED) != 0]
+    if delay_column != 'DELAY_DUE_LATE_AIRCRAFT':
+        rows = rows[(rows['DelayCause'] & status.CAUSE_BITS[delay_column]) != 0]
+    return rows.groupby('DEST', observed=True)['Flights'].sum()
+
+
+# sorted list of the airports on the Departures (ORIGIN) or Arrivals (DEST) page.
+def airports(cube, side):
+    return sorted(cube_slice(cube, DRILLDOWN_SETS[side][0])[side].unique())
+
+
+# sorted list of the airlines flying from (or to) the given airport.
+def airlines_at(cube, side, airport):
+    rows = cube_slice(cube, DRILLDOWN_SETS[side][0])
+    return sorted(rows.loc[rows[side] == airport, 'AIRLINE'].unique())
+
+
+# the rows of a Departures (ORIGIN) or Arrivals (DEST) grouping set for one airport and airline.
+def drilldown_slice(cube, grouping, side, airport, airline):
+    rows = cube_slice(cube, grouping)
+    return rows[(rows[side] == airport) & (rows['AIRLINE'] == airline)]
+
+
+# number of flights per scheduled hour (0-23) of an airline at an airport.
+def hour_flights(cube, side, airport, airline):
+    grouping = DRILLDOWN_SETS[side][0]
+    hour = GROUPING_SETS[grouping][-1]
+    rows = drilldown_slice(cube, grouping, side, airport, airline)
+    return np.bincount(rows[hour], weights=rows['Flights'], minlength=24).astype('int64')
+
+
+# the status and delay type classification of an airline's flights at an airport, see flights.status.classify.
+def classify(cube, side, airport, airline, delayed):
+    rows = drilldown_slice(cube, DRILLDOWN_SETS[side][1], side, airport, airline)
+    minutes = rows[list(CAUSE_MINUTES.values())].set_axis(status.DELAY_COLUMNS, axis=1)
+    reports = rows[list(CAUSE_REPORTS.values())].set_axis(status.DELAY_COLUMNS, axis=1)
+    return status.classify_aggregates(rows['Status'], rows['DelayCause'], rows['Flights'], minutes, reports, delayed)
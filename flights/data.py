@@ -0,0 +1,133 @@
+from functools import partial
+
+import pandas as pd
+import streamlit as st
+
+from flights import config, cube, index, precompute, profile, routes, sample, sketches, store
+
+# with copy on write, filtering, renaming and assigning on the shared frame create new frames which share the
+# same column memory as the original, and any change made to them is never written back into the shared frame.
+pd.set_option("mode.copy_on_write", True)
+
+
+# loading the flights once per server process and handing the very same frame to every page and session.
+# unlike st.cache_data this doesn't pickle and copy the frame on every rerun, so the pages must treat it as
+# read only and build their own derived views (with assign, rename, filters, ...) instead of changing it.
+# the cache is keyed by the store's fingerprint, so a month added with flights.append (or the store written again by
+# flights.ingest) is picked up by running apps.
+def get_flights(csv=store.CSV_PATH):
+    return load_flights(csv, store.store_fingerprint(), store.file_version(store.ARROW_PATH))
+
+
+@st.cache_resource(max_entries=1, show_spinner="Loading flights data...")
+def load_flights(csv, version, arrow_version):
+    with profile.section('flights', 'load'):
+        if config.DATA_MODE == "mmap":
+            if arrow_version is None:
+                raise FileNotFoundError(f"{store.ARROW_PATH} doesn't exist, build it first with: python -m flights.ingest")
+            return store.map_arrow()
+        return store.load_data(csv)
+
+
+# what the ingest (or stream) step saved to path, or when it saved nothing (saved is None) what build makes of the shared
+# flights data, timed as the given profiling section. the aggregates mode has no flights to build it from.
+def saved_or_built(saved, build, section, path):
+    if saved is not None:
+        return saved
+    if config.DATA_MODE == "aggregates":
+        raise FileNotFoundError(f"{path} doesn't exist, build it first with: python -m flights.stream <csv>")
+    flights_data = get_flights()
+    with profile.section(section, 'load'):
+        return build(flights_data)
+
+
+# the aggregate cube which the Home page charts are looked up from, read from disk if it was built by the ingest
+# (or stream) step or otherwise built from the shared flights data.
+def get_cube(path=cube.CUBE_PATH):
+    return load_aggregates(path, store.file_version(path), store.store_version())
+
+
+@st.cache_resource(max_entries=1, show_spinner="Loading flights aggregates...")
+def load_aggregates(path, version, store_version):
+    return saved_or_built(cube.load_cube(path), cube.build_cube, 'cube', path)
+
+
+# the airport/airline index of the shared flights data for the Departures (ORIGIN) or Arrivals (DEST) page. the cache is
+# keyed by the store's fingerprint and the index file, so an index written again by a re-ingest of the same months is
+# picked up along with the flights.
+def get_index(side, index_dir=index.INDEX_DIR):
+    return load_airport_index(side, index_dir, store.store_fingerprint(),
+                              store.file_version(index.index_paths(side, index_dir)[0]))
+
+
+@st.cache_resource(max_entries=2, show_spinner="Loading airport index...")
+def load_airport_index(side, index_dir, fingerprint, version):
+    flights_data = get_flights()
+    airport_index = index.load_index(side, len(flights_data), index_dir)
+    if airport_index is None:
+        with profile.section(f'{side} index', 'load'):
+            airport_index = index.build_index(flights_data, side)
+    return airport_index
+
+
+# the drill-downs of every airport and airline of the Departures (ORIGIN) or Arrivals (DEST) page written by
+# `python -m flights.precompute`, or None when they haven't been computed for the flights in the store.
+# the cache is keyed by the store's fingerprint and the drill-downs' file, so a new precompute is picked up by running apps.
+def get_drilldowns(side, drilldown_dir=precompute.DRILLDOWN_DIR):
+    return load_precomputed(side, drilldown_dir, store.store_fingerprint(),
+                            store.file_version(precompute.drilldown_path(side, drilldown_dir)))
+
+
+@st.cache_resource(max_entries=2)
+def load_precomputed(side, drilldown_dir, fingerprint, version):
+    return precompute.load_drilldowns(side, fingerprint, drilldown_dir)
+
+
+# the route matrix of the Routes page, read from disk if it was built by the ingest (or stream) step or otherwise built
+# from the shared flights data like the cube.
+def get_routes(path=routes.ROUTES_PATH):
+    return load_route_matrix(path, store.file_version(path), store.store_version())
+
+
+@st.cache_resource(max_entries=1, show_spinner="Loading routes...")
+def load_route_matrix(path, version, store_version):
+    return routes.route_matrix(saved_or_built(routes.load_routes(path), routes.build_routes, 'routes', path))
+
+
+# the delay sketches of every airport and airline of the Departures (ORIGIN) or Arrivals (DEST) page, read from disk if
+# they were built by the ingest (or stream) step or otherwise built from the shared flights data.
+def get_sketches(side, sketch_dir=sketches.SKETCH_DIR):
+    return load_delay_sketches(side, sketch_dir, store.file_version(sketches.sketch_path(side, sketch_dir)),
+                               store.store_version())
+
+
+@st.cache_resource(max_entries=2, show_spinner="Loading delay percentiles...")
+def load_delay_sketches(side, sketch_dir, version, store_version):
+    delay_sketches = saved_or_built(sketches.load_sketches(side, sketch_dir), partial(sketches.build_sketches, side=side),
+                                    f'{side} sketches', sketch_dir)
+    return sketches.index_sketches(delay_sketches, side)
+
+
+# the stratified sample of the flights written by the ingest, which the Home page previews its charts from in the approximate
+# mode, or None when it hasn't been built.
+def get_sample(path=sample.SAMPLE_PATH):
+    return load_flights_sample(path, store.file_version(path), store.store_version())
+
+
+@st.cache_resource(max_entries=1)
+def load_flights_sample(path, version, store_version):
+    return sample.load_sample(path)
+
+
+# the version of the data the pages are showing, which changes when a month is appended or the cube is rebuilt.
+def dataset_version():
+    return (config.DATA_MODE, config.BACKEND, store.store_version(), store.file_version(store.ARROW_PATH),
+            store.file_version(cube.CUBE_PATH), store.file_version(routes.ROUTES_PATH),
+            tuple(store.file_version(sketches.sketch_path(side)) for side in sketches.DELAYS))
+
+
+# the duckdb connection of the duckdb backend, shared by every page and session.
+@st.cache_resource
+def get_connection():
+    from flights import sql
+    return sql.connect()
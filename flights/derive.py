@@ -0,0 +1,41 @@
+import calendar
+
+from flights import status
+
+# columns which are derived from the flights once when they are loaded or built, so the pages don't have to parse dates
+# and times on every rerun.
+DERIVED_COLUMNS = ['Month', 'DayOfWeek', 'DepHour', 'ArrHour', 'Status', 'DelayCause']
+
+
+# hour (0-23) of a scheduled HHMM time such as 1745, where 2400 (midnight at the end of the day) becomes hour 0.
+def hour_of(times):
+    return ((times // 100) % 24).astype('int8')
+
+
+# the year and month of a flight date as one number, for example 202301 for January 2023, so the months sort in order and
+# the same month of different years is kept apart.
+def year_month(dates):
+    return (dates.dt.year * 100 + dates.dt.month).astype('int32')
+
+
+# the name of a year and month shown on the pages, for example January 2023.
+def month_label(month):
+    return f"{calendar.month_name[int(month) % 100]} {int(month) // 100}"
+
+
+DERIVATIONS = {
+    'Month': lambda frame: year_month(frame['FL_DATE']),
+    # day of the week from 0 (Monday) to 6 (Sunday).
+    'DayOfWeek': lambda frame: frame['FL_DATE'].dt.dayofweek.astype('int8'),
+    'DepHour': lambda frame: hour_of(frame['CRS_DEP_TIME']),
+    'ArrHour': lambda frame: hour_of(frame['CRS_ARR_TIME']),
+    # packed status code and delay cause mask, see flights.status.
+    'Status': status.status_codes,
+    'DelayCause': status.cause_masks,
+}
+
+
+# adding the derived columns which the frame doesn't have yet, without changing the given frame.
+def add_derived_columns(frame, columns=DERIVED_COLUMNS):
+    missing = {column: DERIVATIONS[column] for column in columns if column not in frame}
+    return frame.assign(**missing) if missing else frame
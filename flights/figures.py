@@ -0,0 +1,75 @@
+import threading
+from collections import OrderedDict
+
+import streamlit as st
+
+from flights import config
+from flights.data import dataset_version
+
+
+# the plotly figures of the pages kept for reuse by every session, keyed by (page, chart, selections), up to max_bytes
+# of serialized figures. the least recently used figures are dropped first, and all of them are dropped when the data
+# changes. the pages never change a figure after it is built, so the same figure object can be handed to every session.
+class FigureCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.figures = OrderedDict()
+        self.size = 0
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def lookup(self, key, version):
+        with self.lock:
+            if version != self.version:
+                self.figures.clear()
+                self.size = 0
+                self.version = version
+            if key in self.figures:
+                self.figures.move_to_end(key)
+                self.hits += 1
+                return True, self.figures[key][0]
+            self.misses += 1
+            return False, None
+
+    def store(self, key, version, figure):
+        # the size of a figure is the size of its json, which is what is sent to the browser. a page can also cache a tuple
+        # of figures which are built together.
+        size = sum(len(part.to_json()) for part in (figure if isinstance(figure, tuple) else (figure,)) if part is not None)
+        with self.lock:
+            if version != self.version or size > self.max_bytes:
+                return
+            if key in self.figures:
+                self.size -= self.figures.pop(key)[1]
+            self.figures[key] = (figure, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                self.size -= self.figures.popitem(last=False)[1][1]
+
+    def stats(self):
+        return {'figures': len(self.figures), 'size_mb': self.size / 2**20, 'hits': self.hits, 'misses': self.misses}
+
+
+@st.cache_resource
+def get_figure_cache():
+    return FigureCache(int(config.FIGURE_CACHE_MB * 2**20))
+
+
+# the figure of a chart for the given selections, built with build() only when it isn't cached yet. build may return
+# None (for a chart which isn't shown for the selections), which is cached as well.
+def cached(page, chart, selections, build):
+    if config.FIGURE_CACHE_MB <= 0:
+        return build()
+    cache = get_figure_cache()
+    key = (page, chart, selections)
+    version = dataset_version()
+    found, figure = cache.lookup(key, version)
+    if not found:
+        figure = build()
+        cache.store(key, version, figure)
+    return figure
+
+
+def figure_stats():
+    return get_figure_cache().stats()
@@ -0,0 +1,99 @@
+import os
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+INDEX_DIR = "data/flights_index"
+
+
+# the row positions of the flights sorted by airport and then airline, and for every (airport, airline) pair the
+# range of those positions which belong to it. side is either ORIGIN or DEST.
+class AirportIndex(NamedTuple):
+    side: str
+    rows: np.ndarray
+    offsets: pd.DataFrame
+
+
+def build_index(frame, side):
+    airports = frame[side].cat.codes.to_numpy()
+    airlines = frame['AIRLINE'].cat.codes.to_numpy()
+    # a stable sort, so the flights of each pair stay in the same order as in the frame.
+    rows = np.lexsort((airlines, airports)).astype('int32')
+
+    sizes = frame.groupby([side, 'AIRLINE'], observed=True).size()
+    stops = sizes.cumsum()
+    offsets = pd.DataFrame({'start': stops - sizes, 'stop': stops}).astype('int64')
+    return AirportIndex(side, rows, offsets)
+
+
+# extending an index with flights which were added after the ones it was built from, where start is the row position of the
+# first added flight. only the added flights are sorted, and each pair's rows are the old ones followed by the added ones.
+def append_index(index, frame, start):
+    added = build_index(frame, index.side)
+    old_offsets = plain_keys(index.offsets)
+    new_offsets = plain_keys(added.offsets)
+    pairs = old_offsets.index.union(new_offsets.index)
+    old_offsets = old_offsets.reindex(pairs, fill_value=0)
+    new_offsets = new_offsets.reindex(pairs, fill_value=0)
+
+    ranges = zip(old_offsets['start'], old_offsets['stop'], new_offsets['start'], new_offsets['stop'])
+    rows = np.concatenate([part for old_start, old_stop, new_start, new_stop in ranges
+                           for part in (index.rows[old_start:old_stop], added.rows[new_start:new_stop] + start)])
+    rows = rows.astype('int32')
+
+    sizes = (old_offsets['stop'] - old_offsets['start']) + (new_offsets['stop'] - new_offsets['start'])
+    stops = sizes.cumsum()
+    return AirportIndex(index.side, rows, pd.DataFrame({'start': stops - sizes, 'stop': stops}).astype('int64'))
+
+
+# offsets keyed by plain strings instead of categories, so the offsets of different flights can be lined up.
+def plain_keys(offsets):
+    keys = list(offsets.index.names)
+    return offsets.reset_index().astype({key: 'object' for key in keys}).set_index(keys).sort_index()
+
+
+# the files of the row positions and of the offsets of a saved index.
+def index_paths(side, index_dir=INDEX_DIR):
+    return os.path.join(index_dir, f"{side}.npy"), os.path.join(index_dir, f"{side}.parquet")
+
+
+# the files are written next to the old ones and then swapped in, since running apps have the old rows mapped into memory
+# and would crash reading past the end of a file which was rewritten in place.
+def save_index(index, index_dir=INDEX_DIR):
+    os.makedirs(index_dir, exist_ok=True)
+    rows_path, offsets_path = index_paths(index.side, index_dir)
+    with open(f"{rows_path}.tmp", "wb") as rows_file:
+        np.save(rows_file, index.rows)
+    index.offsets.reset_index().to_parquet(f"{offsets_path}.tmp", index=False)
+    os.replace(f"{rows_path}.tmp", rows_path)
+    os.replace(f"{offsets_path}.tmp", offsets_path)
+
+
+# reading a saved index, or None when there is none or it was built for a different number of flights.
+def load_index(side, n_rows, index_dir=INDEX_DIR):
+    rows_path, offsets_path = index_paths(side, index_dir)
+    if not (os.path.exists(rows_path) and os.path.exists(offsets_path)):
+        return None
+    rows = np.load(rows_path, mmap_mode='r')
+    if len(rows) != n_rows:
+        return None
+    offsets = pd.read_parquet(offsets_path).set_index([side, 'AIRLINE']).sort_index()
+    return AirportIndex(side, rows, offsets)
+
+
+# sorted list of the airports in the index. the offsets are in the order of the airport categories, which isn't
+# alphabetical when the index was built from several partitions of the store.
+def airports(index):
+    return sorted(index.offsets.index.get_level_values(0).unique())
+
+
+# sorted list of the airlines flying from (or to) the given airport.
+def airlines_at(index, airport):
+    return sorted(index.offsets.loc[airport].index)
+
+
+# row positions of the flights of an airline at an airport, in the same order as in the frame.
+def rows_for(index, airport, airline):
+    start, stop = index.offsets.loc[(airport, airline)]
+    return np.asarray(index.rows[start:stop])
@@ -0,0 +1,62 @@
+import argparse
+import os
+
+from flights.cube import CUBE_PATH, build_cube, save_cube
+from flights.index import INDEX_DIR, build_index, save_index
+from flights.precompute import DRILLDOWN_DIR, precompute_all
+from flights.routes import ROUTES_PATH, build_routes, save_routes
+from flights.sample import SAMPLE_PATH, SAMPLE_ROWS, build_sample, save_sample
+from flights.sketches import DELAYS, SKETCH_DIR, build_sketches, save_sketches
+from flights.store import ARROW_PATH, CSV_PATH, STORE_DIR, build_store, write_arrow
+
+
+# command line entry point for converting the csv into the parquet store, run with: python -m flights.ingest
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert the flights csv into a typed, month-partitioned parquet store.")
+    parser.add_argument("csv", nargs="?", default=CSV_PATH, help="path to the flights csv")
+    parser.add_argument("--store", default=STORE_DIR, help="directory to write the store to")
+    parser.add_argument("--cube", default=CUBE_PATH, help="path to write the aggregate cube to")
+    parser.add_argument("--index", default=INDEX_DIR, help="directory to write the airport/airline indexes to")
+    parser.add_argument("--routes", default=ROUTES_PATH, help="path to write the route matrix to")
+    parser.add_argument("--sketches", default=SKETCH_DIR, help="directory to write the delay percentile sketches to")
+    parser.add_argument("--sample", default=SAMPLE_PATH, help="path to write the sample of the flights to")
+    parser.add_argument("--sample-rows", type=int, default=SAMPLE_ROWS, help="about how many flights to sample")
+    parser.add_argument("--arrow", default=ARROW_PATH, help="path to write the arrow file for the mmap data mode to")
+    parser.add_argument("--drilldowns", default=DRILLDOWN_DIR, help="directory of the precomputed drill-downs to update")
+    args = parser.parse_args(argv)
+
+    frame = build_store(args.csv, args.store)
+    print(f"wrote {len(frame):,} flights to {args.store}")
+
+    aggregates = build_cube(frame)
+    save_cube(aggregates, args.cube)
+    print(f"wrote {len(aggregates):,} aggregate rows to {args.cube}")
+
+    route_entries = build_routes(frame)
+    save_routes(route_entries, args.routes)
+    print(f"wrote {len(route_entries):,} route entries to {args.routes}")
+
+    for side in DELAYS:
+        save_sketches(build_sketches(frame, side), side, args.sketches)
+    print(f"wrote delay sketches to {args.sketches}")
+
+    flights_sample = build_sample(frame, args.sample_rows)
+    save_sample(flights_sample, args.sample)
+    print(f"wrote a sample of {len(flights_sample):,} flights to {args.sample}")
+
+    # the indexes point at row positions, which is why the frame is in the order the pages read the store in.
+    for side in ['ORIGIN', 'DEST']:
+        save_index(build_index(frame, side), args.index)
+    print(f"wrote airport indexes to {args.index}")
+
+    write_arrow(frame, args.arrow)
+    print(f"wrote {args.arrow}")
+
+    # the drill-downs are only computed with flights.precompute, but once they have been they are kept up to date.
+    if os.path.isdir(args.drilldowns):
+        precompute_all(args.store, args.drilldowns)
+        print(f"wrote the drill-downs of every airport and airline to {args.drilldowns}")
+
+
+if __name__ == "__main__":
+    main()
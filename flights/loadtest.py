@@ -0,0 +1,276 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.request
+
+import numpy as np
+import pandas as pd
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from tornado.websocket import websocket_connect
+
+from flights.cube import CUBE_PATH, cube_slice, load_cube, months
+from flights.derive import month_label
+from flights.profile import process_rss
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# how often a simulated user goes to each page, and the most widget interactions they make there before moving on.
+PAGE_WEIGHTS = {'Home': 0.4, 'Departures': 0.25, 'Arrivals': 0.25, 'Routes': 0.1}
+MAX_INTERACTIONS = 4
+
+# the widgets the pages use, which are the only ones a session knows how to change.
+WIDGETS = ('selectbox', 'multiselect', 'radio', 'slider')
+
+
+# how often each option of a widget is picked relative to the others: the airports and airlines by their number of flights
+# in the cube, and the months by how recent they are, the latest most often. options without a weight (like All, or those
+# of the widgets which aren't airports, airlines or months) are picked as often as the most picked ones.
+def option_weights(cube_path=CUBE_PATH):
+    cube = load_cube(cube_path)
+    if cube is None:
+        return {}
+    flights = pd.concat([cube_slice(cube, 'origin').groupby('ORIGIN', observed=True)['Flights'].sum(),
+                         cube_slice(cube, 'airline').groupby('AIRLINE', observed=True)['Flights'].sum()])
+    weights = (flights / flights.max()).to_dict()
+    weights.update({month_label(month): 1 / (age + 1) for age, month in enumerate(reversed(months(cube)))})
+    return weights
+
+
+# one simulated browser tab connected to the server over the same websocket as the real frontend. like the frontend, it
+# keeps the state of every widget shown by the last run and sends all of them with each rerun.
+class Session:
+    def __init__(self, url, rng, weights):
+        self.url = url
+        self.rng = rng
+        self.weights = weights
+        self.connection = None
+        self.pages = {}
+        self.page = ""
+        self.widgets = {}
+        self.states = {}
+        self.errors = 0
+
+    async def connect(self):
+        self.connection = await websocket_connect(self.url.replace("http", "ws", 1) + "/_stcore/stream")
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+    # rerunning the page with the current widget states, or going to another page, and waiting until the run has finished.
+    # returns the seconds the rerun took, from sending it to the server reporting that the script finished.
+    async def rerun(self, page=None):
+        if page is not None and self.pages.get(page, self.page) != self.page:
+            self.page = self.pages[page]
+            self.states = {}
+        message = BackMsg()
+        message.rerun_script.page_script_hash = self.page
+        message.rerun_script.widget_states.widgets.extend(self.states.values())
+
+        started = time.perf_counter()
+        await self.connection.write_message(message.SerializeToString(), binary=True)
+        widgets = {}
+        while True:
+            data = await self.connection.read_message()
+            if data is None:
+                raise ConnectionError("the server closed the connection")
+            received = ForwardMsg()
+            received.ParseFromString(data)
+            kind = received.WhichOneof('type')
+            if kind == 'new_session':
+                self.pages = {page.page_name: page.page_script_hash for page in received.new_session.app_pages}
+                self.page = received.new_session.page_script_hash
+            elif kind == 'delta' and received.delta.WhichOneof('type') == 'new_element':
+                element = received.delta.new_element
+                element_type = element.WhichOneof('type')
+                if element_type in WIDGETS:
+                    widget = getattr(element, element_type)
+                    widgets[widget.id] = (element_type, widget)
+                elif element_type == 'exception':
+                    self.errors += 1
+            elif kind == 'script_finished' and received.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                break
+        seconds = time.perf_counter() - started
+
+        # forgetting the widgets which weren't shown by this run, like the browser does.
+        self.widgets = widgets
+        self.states = {widget_id: state for widget_id, state in self.states.items() if widget_id in widgets}
+        return seconds
+
+    # changing one of the widgets on the page at random, picking its options by their weights (see option_weights), so
+    # the busiest airports and airlines and the most recent months are picked the most, like real users do.
+    def interact(self):
+        widget_id, (widget_type, widget) = self.rng.choice(sorted(self.widgets.items()))
+        state = WidgetState(id=widget_id)
+        if widget_type == 'slider':
+            steps = int(round((widget.max - widget.min) / widget.step))
+            state.double_array_value.data.append(widget.min + self.rng.randint(0, steps) * widget.step)
+        elif not widget.options:
+            return
+        else:
+            positions = range(len(widget.options))
+            weights = [self.weights.get(option, 1.0) for option in widget.options]
+            if widget_type == 'multiselect':
+                count, picked = min(len(widget.options), self.rng.randint(1, 3)), set()
+                while len(picked) < count:
+                    picked.add(self.rng.choices(positions, weights)[0])
+                state.int_array_value.data.extend(sorted(picked))
+            else:
+                state.int_value = self.rng.choices(positions, weights)[0]
+        self.states[widget_id] = state
+
+
+# one user clicking through the pages until the end of the run, waiting about think seconds between clicks.
+async def run_session(number, url, started, until, think, ramp, seed, records, weights):
+    rng = random.Random(f"{seed}-{number}")
+    await asyncio.sleep(rng.uniform(0, ramp))
+    session = Session(url, rng, weights)
+    await session.connect()
+
+    def record(page, action, seconds):
+        records.append({'time': time.perf_counter() - started, 'session': number, 'page': page, 'action': action,
+                        'seconds': seconds, 'errors': session.errors})
+
+    try:
+        record('Home', 'load', await session.rerun())
+        while time.perf_counter() < until:
+            page = rng.choices(list(PAGE_WEIGHTS), list(PAGE_WEIGHTS.values()))[0]
+            record(page, 'load', await session.rerun(page))
+            for _ in range(rng.randint(1, MAX_INTERACTIONS)):
+                await asyncio.sleep(rng.expovariate(1 / think) if think > 0 else 0)
+                if time.perf_counter() >= until or not session.widgets:
+                    break
+                session.interact()
+                record(page, 'interaction', await session.rerun())
+    finally:
+        session.close()
+
+
+async def sample_rss(pid, started, until, interval, samples):
+    while time.perf_counter() < until:
+        samples.append((time.perf_counter() - started, process_rss(pid)))
+        await asyncio.sleep(interval)
+    samples.append((time.perf_counter() - started, process_rss(pid)))
+
+
+async def load_test(url, sessions, duration, think, ramp, seed, pid=None, interval=1.0, weights=None):
+    records, samples = [], []
+    started = time.perf_counter()
+    until = started + duration
+    tasks = [run_session(number, url, started, until, think, ramp, seed, records, weights or {})
+             for number in range(sessions)]
+    if pid is not None:
+        tasks.append(sample_rss(pid, started, until, interval, samples))
+    await asyncio.gather(*tasks)
+    return records, samples, time.perf_counter() - started
+
+
+# starting the app with flights.serve on the given port and waiting until it answers its health check.
+def start_server(port, timeout=120):
+    server = subprocess.Popen([sys.executable, "-m", "flights.serve", "--server.port", str(port), "--server.headless", "true",
+                               "--browser.gatherUsageStats", "false"], cwd=ROOT, stdout=subprocess.DEVNULL,
+                              stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"the server exited with code {server.returncode}")
+        try:
+            with urllib.request.urlopen(f"http://localhost:{port}/_stcore/health", timeout=1) as response:
+                if response.status == 200:
+                    return server
+        except OSError:
+            time.sleep(0.25)
+    server.terminate()
+    raise TimeoutError(f"the server didn't start within {timeout}s")
+
+
+def latency_summary(seconds):
+    seconds = np.asarray(seconds)
+    return {'reruns': len(seconds), 'p50': float(np.percentile(seconds, 50)), 'p95': float(np.percentile(seconds, 95)),
+            'max': float(seconds.max())}
+
+
+# the latency of the reruns of every page and action and of all of them, the throughput, and how the server's memory grew.
+# the growth is the slope of the memory over the run after warm_up (a share of the run, while the caches fill up), and
+# the memory is flagged as growing when it goes up by more than growth_limit MB per minute.
+def summarize(records, samples, duration, sessions, warm_up=0.2, growth_limit=1.0):
+    summary = {'sessions': sessions, 'seconds': duration, 'reruns': len(records),
+               'throughput': len(records) / duration if duration else 0.0,
+               'errors': sum(max((r['errors'] for r in records if r['session'] == s), default=0) for s in range(sessions))}
+    if records:
+        summary['latency'] = latency_summary([r['seconds'] for r in records])
+        keys = sorted({(r['page'], r['action']) for r in records})
+        summary['pages'] = {f"{page} {action}": latency_summary([r['seconds'] for r in records
+                                                                 if (r['page'], r['action']) == (page, action)])
+                            for page, action in keys}
+
+    samples = [(t, mb) for t, mb in samples if mb is not None]
+    if samples:
+        times, memory = np.array(samples).T
+        steady = times >= warm_up * duration
+        slope = np.polyfit(times[steady], memory[steady], 1)[0] * 60 if steady.sum() >= 3 else 0.0
+        summary['memory'] = {'start_mb': float(memory[0]), 'peak_mb': float(memory.max()), 'end_mb': float(memory[-1]),
+                             'growth_mb_per_min': float(slope), 'growing': bool(slope > growth_limit)}
+        summary['rss'] = [[float(t), float(mb)] for t, mb in samples]
+    return summary
+
+
+# command line entry point for the load test, run with: python -m flights.loadtest --sessions 20 --duration 600
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the app with simulated sessions clicking through the pages.")
+    parser.add_argument("--sessions", type=int, default=10, help="number of concurrent sessions")
+    parser.add_argument("--duration", type=float, default=60, help="seconds to keep the sessions clicking")
+    parser.add_argument("--think", type=float, default=1.0, help="average seconds a session waits between clicks")
+    parser.add_argument("--ramp", type=float, default=5.0, help="seconds over which the sessions connect")
+    parser.add_argument("--port", type=int, default=8599, help="port to start the server on")
+    parser.add_argument("--url", help="url of an already running server to test instead of starting one")
+    parser.add_argument("--pid", type=int, help="process id of the server given with --url, to sample its memory")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between the memory samples")
+    parser.add_argument("--growth-limit", type=float, default=1.0,
+                        help="MB per minute of memory growth after the warm-up which is flagged as a leak")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the sessions' random clicks")
+    parser.add_argument("--output", help="path to write the json results to, printed when not given")
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.url:
+        url, pid = args.url.rstrip("/"), args.pid
+    else:
+        server = start_server(args.port)
+        url, pid = f"http://localhost:{args.port}", server.pid
+    try:
+        records, samples, duration = asyncio.run(load_test(url, args.sessions, args.duration, args.think, args.ramp,
+                                                           args.seed, pid, args.interval,
+                                                           option_weights(os.path.join(ROOT, CUBE_PATH))))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    summary = summarize(records, samples, duration, args.sessions, growth_limit=args.growth_limit)
+    if 'latency' in summary:
+        print(f"{summary['reruns']:,} reruns by {args.sessions} sessions in {duration:.0f}s ({summary['throughput']:.1f}/s), "
+              f"p50 {summary['latency']['p50']:.2f}s, p95 {summary['latency']['p95']:.2f}s, {summary['errors']} errors",
+              file=sys.stderr)
+    if 'memory' in summary:
+        memory = summary['memory']
+        print(f"server memory {memory['start_mb']:.0f} MB -> {memory['end_mb']:.0f} MB (peak {memory['peak_mb']:.0f} MB), "
+              f"{memory['growth_mb_per_min']:+.2f} MB/min after warm-up"
+              + (" - MEMORY IS GROWING" if memory['growing'] else ""), file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(summary, output, indent=1)
+    else:
+        print(json.dumps(summary, indent=1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from flights import status
+from flights.status import CAUSE_BITS, DELAY_COLUMNS, DELAY_LABELS
+from flights.store import STORE_DIR, partition_path, read_store, store_fingerprint, store_months
+
+DRILLDOWN_DIR = "data/flights_drilldowns"
+
+# the hour column and the delayed status bit of the Departures (ORIGIN) and Arrivals (DEST) drill-downs.
+HOURS = {'ORIGIN': 'DepHour', 'DEST': 'ArrHour'}
+DELAYED = {'ORIGIN': status.DEP_DELAYED, 'DEST': status.ARR_DELAYED}
+
+# the columns of a precomputed drill-down: the flights per hour, the flights per status code, and for the delayed flights
+# the number of flights of each delay type.
+HOUR_COLUMNS = [f"hour_{hour}" for hour in range(24)]
+CODE_COLUMNS = [f"status_{code}" for code in range(status.STATUS_CODES)]
+COUNT_COLUMNS = [f"{column}_COUNT" for column in DELAY_COLUMNS]
+# and the total minutes and the number of reports of each delay type, which the averages are worked out from when a pair
+# is looked up. they are saved instead of the averages so the drill-downs of new months can be added to them.
+TOTAL_COLUMNS = [f"{column}_TOTAL" for column in DELAY_COLUMNS]
+REPORT_COLUMNS = [f"{column}_REPORTS" for column in DELAY_COLUMNS]
+
+
+# counts of the flights of each (airport, airline) pair for every value of a small integer column, one column per value.
+def count_by(frame, keys, column, values, names):
+    counts = frame.groupby(keys + [column]).size().unstack(fill_value=0)
+    return counts.reindex(columns=range(values), fill_value=0).set_axis(names, axis=1)
+
+
+# the flights per hour, per status code and per delay type, and the total minutes and number of reports of each delay type,
+# of every (airport, airline) pair of the given flights. these all add up over different flights.
+def drilldown_counts(frame, side):
+    frame = frame.astype({side: 'object', 'AIRLINE': 'object'})
+    keys = [side, 'AIRLINE']
+
+    hours = count_by(frame, keys, HOURS[side], 24, HOUR_COLUMNS)
+    codes = count_by(frame, keys, 'Status', status.STATUS_CODES, CODE_COLUMNS)
+
+    # the delay type breakdown only covers the delayed flights, the same as flights.status.classify.
+    delayed = frame[(frame['Status'].to_numpy() & DELAYED[side]) != 0]
+    causes = delayed['DelayCause'].to_numpy()
+    flags = pd.DataFrame({count: (causes & bit) != 0 for count, bit in zip(COUNT_COLUMNS, CAUSE_BITS.values())},
+                         index=delayed.index)
+    cause_counts = flags.join(delayed[keys]).groupby(keys).sum()
+
+    grouped = delayed.groupby(keys)[DELAY_COLUMNS]
+    totals = grouped.sum().astype('int64').set_axis(TOTAL_COLUMNS, axis=1)
+    reports = grouped.count().set_axis(REPORT_COLUMNS, axis=1)
+    return hours.join(codes).join(cause_counts).join(totals).join(reports).fillna(0).astype('int64')
+
+
+def drilldown_columns(side):
+    return [side, 'AIRLINE', HOURS[side], 'Status', 'DelayCause'] + DELAY_COLUMNS
+
+
+# the counts of one month of the store, which is what each worker of the process pool runs, reading only its own partition.
+def drilldown_part(side, path):
+    return drilldown_counts(pd.read_parquet(path, columns=drilldown_columns(side)), side)
+
+
+# the drill-downs of every (airport, airline) pair from the counts of all the months, or of the saved drill-downs and the
+# months added since, which are all added up.
+def combine_parts(parts, side):
+    summed = pd.concat(parts).groupby(level=[0, 1]).sum()
+    return summed.rename_axis([side, 'AIRLINE']).reset_index()
+
+
+# computing the drill-downs of every (airport, airline) pair of one side on a pool of worker processes, one month each, or
+# in one pass over the whole store with a single worker.
+def precompute(side, store_dir=STORE_DIR, workers=None):
+    paths = [partition_path(month, store_dir) for month in store_months(store_dir)]
+    workers = min(workers or os.cpu_count(), len(paths))
+    if workers <= 1:
+        parts = [drilldown_counts(read_store(store_dir, drilldown_columns(side)), side)]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            parts = list(pool.map(drilldown_part, [side] * len(paths), paths))
+    return combine_parts(parts, side).sort_values([side, 'AIRLINE'], ignore_index=True)
+
+
+def drilldown_path(side, drilldown_dir=DRILLDOWN_DIR):
+    return os.path.join(drilldown_dir, f"{side}.parquet")
+
+
+# the drill-downs are saved with the fingerprint of the store they were computed from (see flights.store), so they are
+# ignored once the store changes.
+def save_drilldowns(drilldowns, side, fingerprint, drilldown_dir=DRILLDOWN_DIR):
+    os.makedirs(drilldown_dir, exist_ok=True)
+    table = pa.Table.from_pandas(drilldowns, preserve_index=False)
+    table = table.replace_schema_metadata({**table.schema.metadata, b'store': fingerprint.encode()})
+    pq.write_table(table, drilldown_path(side, drilldown_dir))
+
+
+# reading saved drill-downs indexed by (airport, airline), or None when there are none, they are for another store or
+# they were saved by an older version with the averages instead of the totals.
+def load_drilldowns(side, fingerprint, drilldown_dir=DRILLDOWN_DIR):
+    path = drilldown_path(side, drilldown_dir)
+    if not os.path.exists(path):
+        return None
+    schema = pq.read_schema(path)
+    if schema.metadata.get(b'store') != fingerprint.encode() or not set(TOTAL_COLUMNS) <= set(schema.names):
+        return None
+    return pd.read_parquet(path).set_index([side, 'AIRLINE']).sort_index()
+
+
+# the hour counts and the classification of one pair, the same as computing them from its flights.
+def lookup(drilldowns, airport, airline):
+    row = drilldowns.loc[(airport, airline)]
+    labels = [DELAY_LABELS[column] for column in DELAY_COLUMNS]
+    totals = row[TOTAL_COLUMNS].to_numpy(dtype='float64')
+    reports = row[REPORT_COLUMNS].to_numpy(dtype='float64')
+    means = np.divide(totals, reports, out=np.full(reports.shape, np.nan), where=reports > 0)
+    classification = status.Classification(row[CODE_COLUMNS].to_numpy(dtype='int64'),
+                                           pd.Series(row[COUNT_COLUMNS].to_numpy(dtype='int64'), index=labels),
+                                           pd.Series(means, index=labels))
+    return row[HOUR_COLUMNS].to_numpy(dtype='int64'), classification
+
+
+def precompute_all(store_dir=STORE_DIR, drilldown_dir=DRILLDOWN_DIR, workers=None):
+    fingerprint = store_fingerprint(store_dir)
+    for side in ['ORIGIN', 'DEST']:
+        save_drilldowns(precompute(side, store_dir, workers), side, fingerprint, drilldown_dir)
+
+
+# adding the drill-downs of the new months of the store to the saved ones, reading only the new partitions, where
+# fingerprint is the one of the store before the months were added. drill-downs which weren't saved from that store are
+# computed again from all of it instead.
+def append_drilldowns(months, fingerprint, store_dir=STORE_DIR, drilldown_dir=DRILLDOWN_DIR):
+    appended = store_fingerprint(store_dir)
+    for side in ['ORIGIN', 'DEST']:
+        drilldowns = load_drilldowns(side, fingerprint, drilldown_dir)
+        if drilldowns is None:
+            drilldowns = precompute(side, store_dir)
+        else:
+            parts = [drilldown_part(side, partition_path(month, store_dir)) for month in months]
+            drilldowns = combine_parts([drilldowns] + parts, side).sort_values([side, 'AIRLINE'], ignore_index=True)
+        save_drilldowns(drilldowns, side, appended, drilldown_dir)
+
+
+# command line entry point for the precompute, run with: python -m flights.precompute
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute the Departures and Arrivals drill-downs of every airport and airline.")
+    parser.add_argument("--store", default=STORE_DIR, help="directory of the parquet store")
+    parser.add_argument("--output", default=DRILLDOWN_DIR, help="directory to write the drill-downs to")
+    parser.add_argument("--workers", type=int, help="number of worker processes, all cores by default")
+    args = parser.parse_args(argv)
+
+    precompute_all(args.store, args.output, args.workers)
+    print(f"wrote the drill-downs of every airport and airline to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
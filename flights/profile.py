@@ -0,0 +1,133 @@
+import contextvars
+import json
+import os
+import time
+from contextlib import contextmanager
+
+from flights import config
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# timing of the chart sections of a page. a page calls start() at the top, phase(section, phase) before the compute and the
+# render part of each chart, which closes the phase before it, and finish() at the bottom. every phase records its wall time,
+# the number of flights (or cube rows) scanned by the lookups made in it and the change in the memory of the process.
+# when profiling is off (see config.PROFILE) all of these return straight away.
+trace = contextvars.ContextVar("flights_trace", default=None)
+# the phase which is being timed. sections computed on other threads (see flights.sections) run in a copy of the context
+# of the page with a phase of their own, so their phases are recorded in the same trace without closing each other's.
+opened = contextvars.ContextVar("flights_phase", default=None)
+
+
+# resident memory of a process in MB, from psutil when it is installed and otherwise from /proc (linux only), or None when
+# neither is there.
+def process_rss(pid):
+    if psutil:
+        return psutil.Process(pid).memory_info().rss / 2**20
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+# resident memory of this process in MB.
+def rss_mb():
+    return process_rss(os.getpid())
+
+
+def start(page):
+    if config.PROFILE:
+        trace.set({'page': page, 'time': time.time(), 'started': time.perf_counter(), 'sections': []})
+        opened.set(None)
+
+
+def open_record(section, phase):
+    return {'section': section, 'phase': phase, 'rows': 0, 'seconds': time.perf_counter(), 'memory_mb': rss_mb()}
+
+
+def close_record(record):
+    record['seconds'] = time.perf_counter() - record['seconds']
+    memory = rss_mb()
+    record['memory_mb'] = None if memory is None else memory - record['memory_mb']
+    return record
+
+
+def close(current):
+    if opened.get() is not None:
+        current['sections'].append(close_record(opened.get()))
+        opened.set(None)
+
+
+def phase(section, phase):
+    current = trace.get()
+    if current is not None:
+        close(current)
+        opened.set(open_record(section, phase))
+
+
+# running compute(*args) with no phase open, closing the last phase it opened at the end. this is how the sections which are
+# computed on other threads are run, inside a copy of the context of the page.
+def detached(compute, *args):
+    current = trace.get()
+    opened.set(None)
+    try:
+        return compute(*args)
+    finally:
+        if current is not None:
+            close(current)
+
+
+# a timed step inside a phase, like loading the data on the first rerun, which is recorded as its own section (its time
+# is also part of the phase it ran in).
+@contextmanager
+def section(section, phase):
+    current = trace.get()
+    if current is None:
+        yield
+        return
+    record = open_record(section, phase)
+    try:
+        yield
+    finally:
+        current['sections'].append(close_record(record))
+
+
+# counting rows scanned by a lookup towards the phase it was made in.
+def scanned(rows):
+    if trace.get() is not None and opened.get() is not None:
+        opened.get()['rows'] += int(rows)
+
+
+# closing the last phase, appending the rerun to the trace log and showing it in the sidebar.
+def finish():
+    current = trace.get()
+    if current is None:
+        return
+    close(current)
+    trace.set(None)
+    rerun = {'time': current['time'], 'page': current['page'],
+             'seconds': time.perf_counter() - current['started'], 'sections': current['sections']}
+
+    if config.TRACE_LOG:
+        os.makedirs(os.path.dirname(config.TRACE_LOG) or ".", exist_ok=True)
+        with open(config.TRACE_LOG, "a") as log:
+            log.write(json.dumps(rerun) + "\n")
+    show_panel(rerun)
+
+
+def show_panel(rerun):
+    import pandas as pd
+    import streamlit as st
+
+    with st.sidebar.expander("Profiling", expanded=True):
+        st.write(f"This rerun of {rerun['page']} took {rerun['seconds']:.3f}s.")
+        sections = pd.DataFrame(rerun['sections'], columns=['section', 'phase', 'seconds', 'rows', 'memory_mb'])
+        st.dataframe(sections.round(4), hide_index=True)
+        from flights.figures import figure_stats
+        st.write("Figure cache:", figure_stats())
@@ -0,0 +1,139 @@
+from typing import NamedTuple
+
+import numpy as np
+
+from flights import config, cube, index, precompute, profile, routes, sketches, status
+from flights.data import (get_connection, get_cube, get_drilldowns, get_flights, get_index, get_routes, get_sample,
+                          get_sketches)
+
+# the lookups behind the charts of all three pages. with the pandas backend they are answered from the cube (and, for the
+# Departures and Arrivals pages, from the flights through the airport index unless only the cube is available), and with the
+# duckdb backend by sql over the parquet store (see flights.sql). both give identical results.
+
+
+def duckdb_backend():
+    return config.BACKEND == "duckdb"
+
+
+# the module which answers the Home page lookups and the data it answers them from.
+def home_backend():
+    if duckdb_backend():
+        from flights import sql
+        return sql, get_connection()
+    return cube, get_cube()
+
+
+def months():
+    engine, source = home_backend()
+    return engine.months(source)
+
+
+def airlines():
+    engine, source = home_backend()
+    return engine.airlines(source)
+
+
+def monthly_flights(airlines=None):
+    engine, source = home_backend()
+    return engine.monthly_flights(source, airlines)
+
+
+def flights_by_day(month=None):
+    engine, source = home_backend()
+    return engine.flights_by_day(source, month)
+
+
+def top_origins(month=None, n=10):
+    engine, source = home_backend()
+    return engine.top_origins(source, month, n)
+
+
+def top_airlines(month=None, n=10):
+    engine, source = home_backend()
+    return engine.top_airlines(source, month, n)
+
+
+def status_flights(month=None):
+    engine, source = home_backend()
+    return engine.status_flights(source, month)
+
+
+def delayed_by_dest(delay_column, month=None):
+    engine, source = home_backend()
+    return engine.delayed_by_dest(source, delay_column, month)
+
+
+# the sample which the Home page charts are previewed from in the approximate mode, or None when the mode is off or there is
+# no sample. the previews are looked up from it with the functions of flights.sample.
+def preview_sample():
+    return get_sample() if config.PREVIEW else None
+
+
+# the drill-down of an airline at an airport on the Departures (ORIGIN) or Arrivals (DEST) page: its number of flights
+# per scheduled hour and the classification of their status and delay types.
+class Drilldown(NamedTuple):
+    hour_counts: np.ndarray
+    classification: status.Classification
+
+
+# the module which answers the Departures and Arrivals lookups and the data it answers them from, or (None, None) when they
+# are answered from the flights in memory through the airport index.
+def drilldown_backend():
+    if duckdb_backend():
+        from flights import sql
+        return sql, get_connection()
+    if config.DATA_MODE == "aggregates":
+        return cube, get_cube()
+    return None, None
+
+
+def airports(side):
+    engine, source = drilldown_backend()
+    if engine is None:
+        return index.airports(get_index(side))
+    return engine.airports(source, side)
+
+
+def airlines_at(side, airport):
+    engine, source = drilldown_backend()
+    if engine is None:
+        return index.airlines_at(get_index(side), airport)
+    return engine.airlines_at(source, side, airport)
+
+
+def drilldown(side, airport, airline):
+    # the drill-downs precomputed for every pair are used whichever backend is set, since they give the same results.
+    drilldowns = get_drilldowns(side)
+    if drilldowns is not None:
+        return Drilldown(*precompute.lookup(drilldowns, airport, airline))
+
+    delayed = status.DEP_DELAYED if side == 'ORIGIN' else status.ARR_DELAYED
+    engine, source = drilldown_backend()
+    if engine is None:
+        rows = index.rows_for(get_index(side), airport, airline)
+        profile.scanned(len(rows))
+        selected = get_flights().take(rows)
+        hour = 'DepHour' if side == 'ORIGIN' else 'ArrHour'
+        return Drilldown(np.bincount(selected[hour], minlength=24), status.classify(selected, delayed))
+    return Drilldown(engine.hour_flights(source, side, airport, airline),
+                     engine.classify(source, side, airport, airline, delayed))
+
+
+# the p50, p90 and p99 delay of an airline at an airport on the Departures (ORIGIN) or Arrivals (DEST) page, for all flights
+# and for the delayed flights of each delay type, answered from the delay sketches (see flights.sketches) whichever backend
+# is set. months is a list of months (see flights.derive), or None for all of them.
+def delay_percentiles(side, airport, airline, months=None):
+    return sketches.percentiles(get_sketches(side), airport, airline, months)
+
+
+# the lookups of the Routes page, which are answered from the sparse route matrix (see flights.routes) whichever backend is set.
+def route_airports():
+    return routes.origins(get_routes())
+
+
+def top_routes(month=None, airline=None, n=10):
+    return routes.top_routes(get_routes(), month, airline, n)
+
+
+def route_fanout(airport, month=None, airline=None):
+    return routes.fanout(get_routes(), airport, month, airline)
@@ -0,0 +1,139 @@
+import os
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from flights import profile, status
+from flights.derive import add_derived_columns
+
+ROUTES_PATH = "data/flights_routes.parquet"
+
+# the routes are kept as the non-empty entries of a sparse origin x destination matrix, with one entry per month and airline
+# of each route holding its number of flights, the number of them which arrived late and the minutes they were late by.
+KEYS = ['Month', 'AIRLINE', 'ORIGIN', 'DEST']
+MEASURES = ['Flights', 'Delayed', 'DelayMinutes']
+
+
+# the entries of the route matrix of the given flights, without changing the given frame.
+def build_routes(frame):
+    frame = add_derived_columns(frame, ['Month', 'Status'])
+    delayed = (frame['Status'].to_numpy() & status.ARR_DELAYED) != 0
+    columns = pd.DataFrame({
+        'Month': frame['Month'],
+        'AIRLINE': frame['AIRLINE'],
+        'ORIGIN': frame['ORIGIN'],
+        'DEST': frame['DEST'],
+        'Flights': 1,
+        'Delayed': delayed.astype('int64'),
+        'DelayMinutes': np.where(delayed, frame['ARR_DELAY'].to_numpy(dtype='float64', na_value=0), 0).astype('int64'),
+    }, index=frame.index)
+    return compact(columns.groupby(KEYS, observed=True)[MEASURES].sum().reset_index())
+
+
+def compact(entries):
+    return entries[KEYS + MEASURES].astype({'Month': 'int32', 'AIRLINE': 'category', 'ORIGIN': 'category', 'DEST': 'category'})
+
+
+# adding up the entries built from different flights, which gives the same entries as building them from all of them at once.
+def merge_routes(parts):
+    stacked = pd.concat([part for part in parts if part is not None], ignore_index=True)
+    stacked = stacked.astype({'AIRLINE': 'object', 'ORIGIN': 'object', 'DEST': 'object'})
+    return compact(stacked.groupby(KEYS)[MEASURES].sum().reset_index())
+
+
+def save_routes(entries, path=ROUTES_PATH):
+    entries.to_parquet(path, index=False)
+
+
+def load_routes(path=ROUTES_PATH):
+    return pd.read_parquet(path) if os.path.exists(path) else None
+
+
+# the route matrix in compressed sparse row form. the routes are sorted by origin and then destination, so the routes
+# from airports[i] are routes starts[i] to starts[i + 1], going to airports[dests[...]]. the entries are sorted by route,
+# so the entries from airports[i] are entries entry_starts[i] to entry_starts[i + 1], and route, month and airline give
+# the route, month (see flights.derive) and position in airlines of each entry.
+class RouteMatrix(NamedTuple):
+    airports: np.ndarray
+    airlines: np.ndarray
+    starts: np.ndarray
+    dests: np.ndarray
+    entry_starts: np.ndarray
+    route: np.ndarray
+    month: np.ndarray
+    airline: np.ndarray
+    flights: np.ndarray
+    delayed: np.ndarray
+    minutes: np.ndarray
+
+
+def route_matrix(entries):
+    origins = entries['ORIGIN'].astype(str).to_numpy()
+    dests = entries['DEST'].astype(str).to_numpy()
+    airports = np.union1d(origins, dests)
+    airlines, airline = np.unique(entries['AIRLINE'].astype(str).to_numpy(), return_inverse=True)
+
+    # numbering every (origin, destination) pair in the order of origin and then destination.
+    pairs = np.searchsorted(airports, origins).astype('int64') * len(airports) + np.searchsorted(airports, dests)
+    pairs, route = np.unique(pairs, return_inverse=True)
+    order = np.argsort(route, kind='stable')
+    route = route[order]
+    starts = np.searchsorted(pairs // len(airports), np.arange(len(airports) + 1))
+
+    return RouteMatrix(airports, airlines, starts, (pairs % len(airports)).astype('int32'),
+                       np.searchsorted(route, starts), route.astype('int32'),
+                       entries['Month'].to_numpy(dtype='int32')[order], airline.astype('int16')[order],
+                       *(entries[measure].to_numpy(dtype='int64')[order] for measure in MEASURES))
+
+
+# the total flights, delayed flights and delay minutes of the routes in first:last of the given entries, keeping only
+# those of the month and airline when they are given.
+def route_totals(matrix, entries, first, last, month=None, airline=None):
+    profile.scanned(entries.stop - entries.start)
+    keep = np.ones(entries.stop - entries.start, dtype=bool)
+    if month is not None:
+        keep &= matrix.month[entries] == month
+    if airline is not None:
+        positions = np.flatnonzero(matrix.airlines == airline)
+        keep &= matrix.airline[entries] == (positions[0] if len(positions) else -1)
+    routes = matrix.route[entries][keep] - first
+    return [np.bincount(routes, weights=values[entries][keep], minlength=last - first).astype('int64')
+            for values in (matrix.flights, matrix.delayed, matrix.minutes)]
+
+
+# a frame of routes with their number of flights, the percent of them which arrived late and the average minutes those
+# were late by, leaving out the routes without any flights.
+def route_frame(matrix, routes, flights, delayed, minutes):
+    origins = np.searchsorted(matrix.starts, routes, side='right') - 1
+    frame = pd.DataFrame({
+        'ORIGIN': matrix.airports[origins],
+        'DEST': matrix.airports[matrix.dests[routes]],
+        'Flights': flights,
+        'DelayRate': np.divide(delayed * 100, flights, out=np.zeros(len(flights)), where=flights > 0),
+        'AvgDelay': np.divide(minutes, delayed, out=np.full(len(flights), np.nan), where=delayed > 0),
+    })
+    return frame[frame['Flights'] > 0]
+
+
+# the n routes with the most flights, optionally in one month and for one airline.
+def top_routes(matrix, month=None, airline=None, n=10):
+    flights, delayed, minutes = route_totals(matrix, slice(0, len(matrix.route)), 0, len(matrix.dests), month, airline)
+    top = np.argsort(-flights, kind='stable')[:n]
+    return route_frame(matrix, top, flights[top], delayed[top], minutes[top]).reset_index(drop=True)
+
+
+# every route from an airport, busiest first, which only looks at the entries of that airport's row of the matrix.
+def fanout(matrix, airport, month=None, airline=None):
+    i = np.searchsorted(matrix.airports, airport)
+    if i == len(matrix.airports) or matrix.airports[i] != airport:
+        return route_frame(matrix, np.arange(0), *(np.zeros(0, dtype='int64') for _ in MEASURES))
+    first, last = matrix.starts[i], matrix.starts[i + 1]
+    entries = slice(matrix.entry_starts[i], matrix.entry_starts[i + 1])
+    frame = route_frame(matrix, np.arange(first, last), *route_totals(matrix, entries, first, last, month, airline))
+    return frame.sort_values('Flights', ascending=False, kind='stable').reset_index(drop=True)
+
+
+# sorted list of the airports which have flights leaving them.
+def origins(matrix):
+    return list(matrix.airports[np.diff(matrix.starts) > 0])
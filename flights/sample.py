@@ -0,0 +1,116 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from flights import profile, status
+from flights.cube import DAY_NAMES
+from flights.derive import add_derived_columns
+
+SAMPLE_PATH = "data/flights_sample.parquet"
+
+# about how many flights the sample keeps however many flights there are, and the fewest it keeps of each month and airline
+# (or all of them when it had fewer flights).
+SAMPLE_ROWS = 100_000
+MIN_STRATUM = 30
+
+# the sample is stratified by month and airline, and keeps the columns the Home page charts are looked up from along with the
+# number of flights of its month and airline (StratumFlights) and how many of them were sampled (StratumSample).
+STRATA = ['Month', 'AIRLINE']
+COLUMNS = ['Month', 'AIRLINE', 'ORIGIN', 'DEST', 'DayOfWeek', 'Status', 'DelayCause']
+
+# the estimates come with the margin of their 95% confidence interval.
+Z = 1.96
+
+
+# a random sample of the flights with the same share of the flights of every month and airline. rate is the share of the
+# flights to keep, which by default keeps about rows flights.
+def build_sample(frame, rows=SAMPLE_ROWS, rate=None, seed=0):
+    frame = add_derived_columns(frame, ['Month', 'DayOfWeek', 'Status', 'DelayCause'])[COLUMNS]
+    rate = rate if rate is not None else min(1.0, rows / max(len(frame), 1))
+    stratum = frame.groupby(STRATA, observed=True).ngroup().to_numpy()
+    sizes = np.bincount(stratum)
+    take = np.minimum(sizes, np.maximum(MIN_STRATUM, np.round(sizes * rate))).astype('int64')
+
+    # shuffling the flights and keeping the first ones of every month and airline.
+    order = np.random.default_rng(seed).permutation(len(frame))
+    rank = pd.Series(stratum[order]).groupby(stratum[order]).cumcount().to_numpy()
+    keep = np.sort(order[rank < take[stratum[order]]])
+    sampled = frame.take(keep).assign(StratumFlights=sizes[stratum[keep]], StratumSample=take[stratum[keep]])
+    return sampled.reset_index(drop=True)
+
+
+# the share of the flights which the sample keeps, so the flights of new months are sampled the same way.
+def sample_rate(sample):
+    strata = sample.groupby(STRATA, observed=True)['StratumFlights'].first()
+    return len(sample) / strata.sum()
+
+
+# adding the sample of the flights of new months to the sample of the old ones.
+def append_sample(sample, frame, seed=0):
+    added = build_sample(frame, rate=sample_rate(sample), seed=seed)
+    merged = pd.concat([sample.astype({'AIRLINE': 'object', 'ORIGIN': 'object', 'DEST': 'object'}),
+                        added.astype({'AIRLINE': 'object', 'ORIGIN': 'object', 'DEST': 'object'})], ignore_index=True)
+    return merged.astype({'AIRLINE': 'category', 'ORIGIN': 'category', 'DEST': 'category'})
+
+
+def save_sample(sample, path=SAMPLE_PATH):
+    sample.to_parquet(path, index=False)
+
+
+def load_sample(path=SAMPLE_PATH):
+    return pd.read_parquet(path) if os.path.exists(path) else None
+
+
+# the estimated number of flights of each group of the sampled rows, where group gives the group of each row, with the margin
+# of its 95% confidence interval. every sampled flight stands for StratumFlights / StratumSample flights of its month and
+# airline, and the variance of the estimate is added up over the months and airlines.
+def estimate(rows, group):
+    cells = pd.DataFrame({'Month': rows['Month'], 'AIRLINE': rows['AIRLINE'], 'Group': group,
+                          'N': rows['StratumFlights'], 'n': rows['StratumSample']})
+    cells = cells.groupby(['Month', 'AIRLINE', 'Group'], observed=True).agg(c=('N', 'size'), N=('N', 'first'), n=('n', 'first'))
+    share = cells['c'] / cells['n']
+    variance = cells['N'] ** 2 * (1 - cells['n'] / cells['N']) * share * (1 - share) / (cells['n'] - 1).clip(lower=1)
+    totals = pd.DataFrame({'Flights': cells['N'] * share, 'Variance': variance}).groupby(level='Group', observed=True).sum()
+    return pd.DataFrame({'Flights': totals['Flights'], 'Margin': Z * np.sqrt(totals['Variance'])}).rename_axis(None)
+
+
+# the sampled flights of a month, or all of them.
+def sample_slice(sample, month=None):
+    profile.scanned(len(sample))
+    return sample if month is None else sample[sample['Month'] == month]
+
+
+# the same lookups as in flights.cube for the Home page, estimated from the sample. each one returns the estimated flights
+# and their margin, indexed the same way as the cube's lookup.
+def flights_by_day(sample, month=None):
+    rows = sample_slice(sample, month)
+    return estimate(rows, rows['DayOfWeek']).sort_index().rename(index=dict(enumerate(DAY_NAMES)))
+
+
+def top_origins(sample, month=None, n=10):
+    rows = sample_slice(sample, month)
+    return estimate(rows, rows['ORIGIN']).nlargest(n, 'Flights')
+
+
+def top_airlines(sample, month=None, n=10):
+    rows = sample_slice(sample, month)
+    return estimate(rows, rows['AIRLINE']).nlargest(n, 'Flights')
+
+
+# the estimated flights of each of the given statuses (see flights.status), which can overlap.
+def status_flights(sample, statuses, month=None):
+    rows = sample_slice(sample, month)
+    codes = rows['Status'].to_numpy()
+    parts = [estimate(rows[((codes & required) == required) & ((codes & excluded) == 0)], name)
+             for name, (required, excluded) in statuses.items()]
+    return pd.concat(parts).reindex(list(statuses), fill_value=0)
+
+
+def delayed_by_dest(sample, delay_column, month=None):
+    rows = sample_slice(sample, month)
+    keep = (rows['Status'].to_numpy() & status.ARR_DELAYED) != 0
+    if delay_column != 'DELAY_DUE_LATE_AIRCRAFT':
+        keep &= (rows['DelayCause'].to_numpy() & status.CAUSE_BITS[delay_column]) != 0
+    rows = rows[keep]
+    return estimate(rows, rows['DEST'])
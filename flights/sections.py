@@ -0,0 +1,47 @@
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from streamlit.runtime.scriptrunner.script_run_context import SCRIPT_RUN_CONTEXT_ATTR_NAME
+
+from flights import config, profile
+
+
+# the threads which compute chart sections, shared by every session. the lookups and figure building are mostly pandas,
+# numpy and duckdb work which releases the GIL, so independent sections can run side by side.
+@st.cache_resource
+def get_pool():
+    return ThreadPoolExecutor(config.SECTION_WORKERS, thread_name_prefix="flights-section")
+
+
+# a section which is computed when its result is asked for, used when there is no pool.
+class Deferred:
+    def __init__(self, compute, args):
+        self.compute = compute
+        self.args = args
+
+    def done(self):
+        return False
+
+    def result(self):
+        return self.compute(*self.args)
+
+
+# running a section on a pool thread as part of the session which submitted it, so streamlit knows which session
+# its cached lookups belong to. it runs in a copy of the context of the page, which carries its profiling trace.
+def run_in(context, compute, args):
+    thread = threading.current_thread()
+    add_script_run_ctx(thread, context)
+    try:
+        return profile.detached(compute, *args)
+    finally:
+        setattr(thread, SCRIPT_RUN_CONTEXT_ATTR_NAME, None)
+
+
+# starting compute(*args) on the pool and returning something whose result() waits for it.
+def submit(compute, *args):
+    if config.SECTION_WORKERS <= 0:
+        return Deferred(compute, args)
+    return get_pool().submit(contextvars.copy_context().run, run_in, get_script_run_ctx(), compute, args)
@@ -0,0 +1,17 @@
+import sys
+
+from streamlit.web import cli
+
+from flights import warmup
+
+
+# starting the app with the data already loading in the background, so the first session doesn't have to wait for all of it.
+# the arguments are passed on to streamlit, run with: python -m flights.serve --server.port 8501
+def main(argv=None):
+    warmup.start()
+    sys.argv = ["streamlit", "run", "Home.py", *(sys.argv[1:] if argv is None else argv)]
+    cli.main()
+
+
+if __name__ == "__main__":
+    main()
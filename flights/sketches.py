@@ -0,0 +1,119 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from flights import profile, status
+from flights.derive import add_derived_columns
+
+SKETCH_DIR = "data/flights_sketches"
+
+# the delay of the Departures (ORIGIN) and Arrivals (DEST) pages and the status bit which marks a flight as delayed by it.
+DELAYS = {'ORIGIN': 'DEP_DELAY', 'DEST': 'ARR_DELAY'}
+DELAYED = {'ORIGIN': status.DEP_DELAYED, 'DEST': status.ARR_DELAYED}
+
+# a sketch of the delays of some flights is the number of their delays in each bucket, where the buckets grow by a factor
+# of GAMMA away from zero so every delay in a bucket is within ACCURACY (2%) of the bucket's value. a sketch is a few
+# hundred counts at most however many flights it covers, and two sketches are merged by adding up their counts.
+ACCURACY = 0.02
+GAMMA = (1 + ACCURACY) / (1 - ACCURACY)
+
+# the flights of each sketch: Cause 0 is every flight which reported a delay (early ones included), and Cause i is the
+# delayed flights with the delay type DELAY_COLUMNS[i - 1] as one of their causes.
+CAUSES = ['All Flights'] + [status.DELAY_LABELS[column] for column in status.DELAY_COLUMNS]
+PERCENTILES = [50, 90, 99]
+
+
+# the bucket of each delay in minutes: 0 for no delay, k for delays up to GAMMA ** (k - 1) minutes and -k for early flights.
+def buckets(minutes):
+    minutes = np.asarray(minutes, dtype='float64')
+    magnitude = np.ceil(np.log(np.maximum(np.abs(minutes), 1)) / np.log(GAMMA)) + 1
+    return (np.sign(minutes) * magnitude).astype('int16')
+
+
+# the minutes each bucket stands for, which is within ACCURACY of every delay in it.
+def bucket_minutes(bucket):
+    bucket = np.asarray(bucket, dtype='float64')
+    magnitude = 2 * GAMMA ** (np.abs(bucket) - 1) / (GAMMA + 1)
+    return np.where(np.abs(bucket) == 1, np.sign(bucket), np.sign(bucket) * magnitude)
+
+
+# the sketches of the delays of every (airport, airline, month, cause) of one side, as one row per non-empty bucket.
+def build_sketches(frame, side):
+    frame = add_derived_columns(frame, ['Month', 'Status', 'DelayCause'])
+    minutes = frame[DELAYS[side]].to_numpy(dtype='float64', na_value=np.nan)
+    reported = ~np.isnan(minutes)
+    delayed = reported & ((frame['Status'].to_numpy() & DELAYED[side]) != 0)
+    causes = frame['DelayCause'].to_numpy()
+
+    keys = pd.DataFrame({side: frame[side], 'AIRLINE': frame['AIRLINE'], 'Month': frame['Month'],
+                         'Bucket': buckets(np.nan_to_num(minutes))}, index=frame.index)
+    parts = [keys[reported].assign(Cause=0)]
+    for cause, bit in enumerate(status.CAUSE_BITS.values(), start=1):
+        parts.append(keys[delayed & ((causes & bit) != 0)].assign(Cause=cause))
+    stacked = pd.concat(parts, ignore_index=True)
+    counts = stacked.groupby([side, 'AIRLINE', 'Month', 'Cause', 'Bucket'], observed=True).size()
+    return compact(counts.reset_index(name='Count'), side)
+
+
+def compact(sketches, side):
+    return sketches[[side, 'AIRLINE', 'Month', 'Cause', 'Bucket', 'Count']].astype({
+        side: 'category', 'AIRLINE': 'category', 'Month': 'int32', 'Cause': 'int8', 'Bucket': 'int16', 'Count': 'int64'})
+
+
+# merging the sketches of different flights (for example of a month added to the store), which gives the same sketches as
+# building them from all of those flights at once.
+def merge_sketches(parts, side):
+    stacked = pd.concat([part for part in parts if part is not None], ignore_index=True)
+    stacked = stacked.astype({side: 'object', 'AIRLINE': 'object'})
+    return compact(stacked.groupby([side, 'AIRLINE', 'Month', 'Cause', 'Bucket'])['Count'].sum().reset_index(), side)
+
+
+def sketch_path(side, sketch_dir=SKETCH_DIR):
+    return os.path.join(sketch_dir, f"{side}.parquet")
+
+
+def save_sketches(sketches, side, sketch_dir=SKETCH_DIR):
+    os.makedirs(sketch_dir, exist_ok=True)
+    sketches.to_parquet(sketch_path(side, sketch_dir), index=False)
+
+
+def load_sketches(side, sketch_dir=SKETCH_DIR):
+    path = sketch_path(side, sketch_dir)
+    return pd.read_parquet(path) if os.path.exists(path) else None
+
+
+# the sketches of one side indexed by (airport, airline), so the sketches of a pair are found without a scan.
+def index_sketches(sketches, side):
+    return sketches.astype({side: 'object', 'AIRLINE': 'object'}).set_index([side, 'AIRLINE']).sort_index()
+
+
+# the given percentiles of a merged sketch, from the counts of its buckets.
+def sketch_percentiles(bucket, count, percentiles=PERCENTILES):
+    order = np.argsort(bucket)
+    bucket, cumulative = np.asarray(bucket)[order], np.cumsum(np.asarray(count)[order])
+    if not len(cumulative):
+        return np.full(len(percentiles), np.nan)
+    # the delay at rank p% of the way from the first to the last flight, the same as numpy's "lower" percentile.
+    ranks = np.floor(np.asarray(percentiles) / 100 * (cumulative[-1] - 1))
+    return bucket_minutes(bucket[np.searchsorted(cumulative, ranks, side='right')])
+
+
+# the delay percentiles of an airline at an airport in the given months (all of them when None), with one row per cause and
+# one column per percentile, and the number of flights each row covers. the sketches of the months are merged first.
+def percentiles(sketches, airport, airline, months=None):
+    try:
+        rows = sketches.loc[[(airport, airline)]]
+    except KeyError:
+        rows = sketches.iloc[:0]
+    profile.scanned(len(rows))
+    if months is not None:
+        rows = rows[rows['Month'].isin(months)]
+    merged = rows.groupby(['Cause', 'Bucket'])['Count'].sum().reset_index()
+
+    table = pd.DataFrame(np.nan, index=CAUSES, columns=[f"p{p}" for p in PERCENTILES])
+    flights = pd.Series(0, index=CAUSES, dtype='int64')
+    for cause, sketch in merged.groupby('Cause'):
+        table.iloc[cause] = sketch_percentiles(sketch['Bucket'].to_numpy(), sketch['Count'].to_numpy())
+        flights.iloc[cause] = int(sketch['Count'].sum())
+    return table.assign(Flights=flights)
@@ -0,0 +1,118 @@
+import os
+
+import duckdb
+import numpy as np
+
+from flights import status
+from flights.cube import DAY_NAMES
+from flights.store import STORE_DIR, partition_key, store_months
+
+# the same lookups as in flights.cube (for the Home page) and flights.data (for the Departures and Arrivals pages), but run
+# by duckdb straight over the parquet store. the month, airline and airport filters and the groupings are pushed down to
+# duckdb, which only reads the partitions and columns a query needs and runs it on all cores. every function returns exactly
+# what its pandas counterpart returns, so the two backends can be swapped and timed against each other.
+
+HOUR_COLUMNS = {'ORIGIN': 'DepHour', 'DEST': 'ArrHour'}
+
+
+# an in-memory duckdb connection. each query runs on its own cursor, so one connection can be shared by every session.
+def connect(threads=None):
+    connection = duckdb.connect()
+    if threads:
+        connection.execute(f"SET threads TO {int(threads)}")
+    return connection
+
+
+# the parquet files to read for a month, or all of them. if no partition has that month, all partitions are passed
+# and the month filter in the query leaves nothing, since duckdb can't read an empty list of files.
+def partition_files(month=None, store_dir=STORE_DIR):
+    months = store_months(store_dir)
+    selected = [m for m in months if month is None or m == partition_key(month)] or months
+    return [os.path.join(store_dir, f"month={m}", "part-0.parquet") for m in selected]
+
+
+# running a query over the flights of the selected month, where {flights} in the query is replaced by the store and
+# {month} by the month filter.
+def query(connection, sql, month=None, params=(), store_dir=STORE_DIR):
+    month_filter = "TRUE" if month is None else f"Month = {int(month)}"
+    sql = sql.format(flights="read_parquet(?, hive_partitioning = false)", month=month_filter)
+    return connection.cursor().execute(sql, [partition_files(month, store_dir), *params]).df()
+
+
+def months(connection):
+    return [int(month) for month in query(connection, "SELECT DISTINCT Month FROM {flights} ORDER BY Month")['Month']]
+
+
+def airlines(connection):
+    return list(query(connection, "SELECT DISTINCT AIRLINE FROM {flights} ORDER BY AIRLINE")['AIRLINE'])
+
+
+def monthly_flights(connection, airlines=None):
+    if airlines is None:
+        counts = query(connection, "SELECT Month, count(*) AS Flights FROM {flights} GROUP BY Month ORDER BY Month")
+        return counts.set_index('Month')['Flights']
+    counts = query(connection, """
+        SELECT AIRLINE, Month, count(*) AS Flights FROM {flights}
+        WHERE list_contains(?, AIRLINE) GROUP BY AIRLINE, Month ORDER BY AIRLINE, Month""", params=[list(airlines)])
+    return counts.set_index(['AIRLINE', 'Month'])['Flights']
+
+
+def flights_by_day(connection, month=None):
+    counts = query(connection, """
+        SELECT DayOfWeek, count(*) AS Flights FROM {flights} WHERE {month} GROUP BY DayOfWeek ORDER BY DayOfWeek""", month)
+    return counts.set_index('DayOfWeek')['Flights'].rename(index=dict(enumerate(DAY_NAMES)))
+
+
+def top_origins(connection, month=None, n=10):
+    counts = query(connection, """
+        SELECT ORIGIN, count(*) AS Flights FROM {flights} WHERE {month}
+        GROUP BY ORIGIN ORDER BY Flights DESC, ORIGIN LIMIT ?""", month, [n])
+    return counts.set_index('ORIGIN')['Flights']
+
+
+def top_airlines(connection, month=None, n=10):
+    counts = query(connection, """
+        SELECT AIRLINE, count(*) AS Flights FROM {flights} WHERE {month}
+        GROUP BY AIRLINE ORDER BY Flights DESC, AIRLINE LIMIT ?""", month, [n])
+    return counts.set_index('AIRLINE')['Flights']
+
+
+def status_flights(connection, month=None):
+    counts = query(connection, "SELECT Status, count(*) AS Flights FROM {flights} WHERE {month} GROUP BY Status", month)
+    return np.bincount(counts['Status'], weights=counts['Flights'], minlength=status.STATUS_CODES).astype('int64')
+
+
+def delayed_by_dest(connection, delay_column, month=None):
+    cause_bit = 0 if delay_column == 'DELAY_DUE_LATE_AIRCRAFT' else status.CAUSE_BITS[delay_column]
+    counts = query(connection, """
+        SELECT DEST, count(*) AS Flights FROM {flights}
+        WHERE {month} AND (Status & ?) != 0 AND (? = 0 OR (DelayCause & ?) != 0)
+        GROUP BY DEST ORDER BY DEST""", month, [status.ARR_DELAYED, cause_bit, cause_bit])
+    return counts.set_index('DEST')['Flights']
+
+
+def airports(connection, side):
+    return list(query(connection, f"SELECT DISTINCT {side} FROM {{flights}} ORDER BY {side}")[side])
+
+
+def airlines_at(connection, side, airport):
+    return list(query(connection, f"SELECT DISTINCT AIRLINE FROM {{flights}} WHERE {side} = ? ORDER BY AIRLINE",
+                      params=[airport])['AIRLINE'])
+
+
+def hour_flights(connection, side, airport, airline):
+    hour = HOUR_COLUMNS[side]
+    counts = query(connection, f"""
+        SELECT {hour} AS Hour, count(*) AS Flights FROM {{flights}} WHERE {side} = ? AND AIRLINE = ? GROUP BY Hour""",
+                   params=[airport, airline])
+    return np.bincount(counts['Hour'], weights=counts['Flights'], minlength=24).astype('int64')
+
+
+def classify(connection, side, airport, airline, delayed):
+    minutes = ", ".join(f"coalesce(sum({column}), 0) AS {column}" for column in status.DELAY_COLUMNS)
+    reports = ", ".join(f"count({column}) AS {column}_REPORTS" for column in status.DELAY_COLUMNS)
+    rows = query(connection, f"""
+        SELECT Status, DelayCause, count(*) AS Flights, {minutes}, {reports} FROM {{flights}}
+        WHERE {side} = ? AND AIRLINE = ? GROUP BY Status, DelayCause""", params=[airport, airline])
+    return status.classify_aggregates(rows['Status'], rows['DelayCause'], rows['Flights'], rows[status.DELAY_COLUMNS],
+                                      rows[[f"{column}_REPORTS" for column in status.DELAY_COLUMNS]], delayed)
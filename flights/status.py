@@ -0,0 +1,97 @@
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+DELAY_COLUMNS = ['DELAY_DUE_CARRIER', 'DELAY_DUE_WEATHER', 'DELAY_DUE_NAS', 'DELAY_DUE_SECURITY', 'DELAY_DUE_LATE_AIRCRAFT']
+
+# readable names for the delay columns used in the charts.
+DELAY_LABELS = {'DELAY_DUE_CARRIER': 'Carrier Delay', 'DELAY_DUE_WEATHER': 'Weather Delay', 'DELAY_DUE_NAS': 'NAS Delay',
+                'DELAY_DUE_SECURITY': 'Security Delay', 'DELAY_DUE_LATE_AIRCRAFT': 'Late Aircraft Delay'}
+
+# bits of the packed flight status code, a flight can have several of them at once (for example cancelled and departed late).
+CANCELLED = 1
+DIVERTED = 2
+DEP_DELAYED = 4
+DEP_ON_TIME = 8
+ARR_DELAYED = 16
+ARR_ON_TIME = 32
+STATUS_CODES = 64
+
+# bit of each delay type in the delay cause mask, a delayed flight can have several causes.
+CAUSE_BITS = {column: 1 << i for i, column in enumerate(DELAY_COLUMNS)}
+CAUSE_MASKS = 32
+
+# how each page defines its flight statuses, as the bits a status code must have and the bits it must not have.
+HOME_STATUSES = {'Delayed': (ARR_DELAYED, 0), 'Diverted': (DIVERTED, 0), 'Cancelled': (CANCELLED, 0),
+                 'On-time': (ARR_ON_TIME, DIVERTED | CANCELLED)}
+DEPARTURE_STATUSES = {'Cancelled': (CANCELLED, 0), 'Delayed': (DEP_DELAYED, 0), 'On time': (DEP_ON_TIME, CANCELLED)}
+ARRIVAL_STATUSES = {'Cancelled': (CANCELLED, 0), 'Delayed': (ARR_DELAYED, 0), 'On time': (ARR_ON_TIME, CANCELLED)}
+
+
+# packing the cancelled/diverted flags and whether the flight left and arrived late or on time into one small integer per flight.
+# flights without a delay value (for example cancelled ones) are neither delayed nor on time.
+def status_codes(frame):
+    dep_delay = frame['DEP_DELAY'].to_numpy(dtype='float32', na_value=np.nan)
+    arr_delay = frame['ARR_DELAY'].to_numpy(dtype='float32', na_value=np.nan)
+    codes = (frame['CANCELLED'].to_numpy() == 1) * CANCELLED
+    codes |= (frame['DIVERTED'].to_numpy() == 1) * DIVERTED
+    codes |= (dep_delay > 0) * DEP_DELAYED
+    codes |= (dep_delay <= 0) * DEP_ON_TIME
+    codes |= (arr_delay > 0) * ARR_DELAYED
+    codes |= (arr_delay <= 0) * ARR_ON_TIME
+    return codes.astype('int8')
+
+
+# one bit per delay type that caused at least a minute of delay for the flight.
+def cause_masks(frame):
+    masks = np.zeros(len(frame), dtype='int8')
+    for column, bit in CAUSE_BITS.items():
+        masks |= (frame[column].to_numpy(dtype='float32', na_value=np.nan) > 0) * np.int8(bit)
+    return masks
+
+
+# turning the number of flights per status code into the number of flights per status, as defined by one of the pages.
+def count_statuses(code_counts, statuses):
+    codes = np.arange(len(code_counts))
+    return {name: int(code_counts[((codes & required) == required) & ((codes & excluded) == 0)].sum())
+            for name, (required, excluded) in statuses.items()}
+
+
+# the result of classifying some flights: the number of flights per status code, and for the delayed ones the number of flights
+# delayed by each delay type and the average delay (in minutes) of each type, both indexed by the readable delay names.
+class Classification(NamedTuple):
+    code_counts: np.ndarray
+    cause_counts: pd.Series
+    cause_means: pd.Series
+
+
+# classifying the flights in one pass over their status codes and delay cause masks. delayed is the status bit which marks a flight
+# as delayed for the delay type breakdown (DEP_DELAYED on the Departures page and ARR_DELAYED on the Arrivals page).
+def classify(frame, delayed):
+    minutes = frame[DELAY_COLUMNS].to_numpy(dtype='float64', na_value=np.nan)
+    reported = ~np.isnan(minutes)
+    return classify_aggregates(frame['Status'], frame['DelayCause'], np.ones(len(frame), dtype='int64'),
+                               np.where(reported, minutes, 0), reported, delayed)
+
+
+# the same classification from flights which were already aggregated, where each row stands for weights flights with the given
+# status code and delay cause mask, minutes holds the total minutes of each delay type and reports the number of flights which
+# reported a value for it (one column per delay type, in the order of DELAY_COLUMNS).
+def classify_aggregates(codes, causes, weights, minutes, reports, delayed):
+    codes = np.asarray(codes, dtype='int64')
+    causes = np.asarray(causes, dtype='int64')
+    weights = np.asarray(weights, dtype='int64')
+    is_delayed = (codes & delayed) != 0
+
+    code_counts = np.bincount(codes, weights=weights, minlength=STATUS_CODES).astype('int64')
+    mask_counts = np.bincount(causes[is_delayed], weights=weights[is_delayed], minlength=CAUSE_MASKS)
+    masks = np.arange(CAUSE_MASKS)
+    cause_counts = [int(mask_counts[(masks & bit) != 0].sum()) for bit in CAUSE_BITS.values()]
+
+    totals = np.asarray(minutes, dtype='float64')[is_delayed].sum(axis=0)
+    reports = np.asarray(reports, dtype='int64')[is_delayed].sum(axis=0)
+    cause_means = np.divide(totals, reports, out=np.full(len(DELAY_COLUMNS), np.nan), where=reports > 0)
+
+    labels = [DELAY_LABELS[column] for column in DELAY_COLUMNS]
+    return Classification(code_counts, pd.Series(cause_counts, index=labels), pd.Series(cause_means, index=labels))
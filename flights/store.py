@@ -0,0 +1,191 @@
+import os
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from flights.derive import DERIVED_COLUMNS, add_derived_columns
+from flights.status import DELAY_COLUMNS
+
+# paths to the raw csv and to the month-partitioned parquet store built from it.
+CSV_PATH = "data/flights_sample_3m.csv"
+STORE_DIR = "data/flights_store"
+# an uncompressed arrow file of the whole store, in the same order, which the "mmap" data mode maps into memory.
+ARROW_PATH = "data/flights.arrow"
+
+# the derived columns are small integers, apart from Month which holds the year as well as the month.
+DERIVED_TYPES = {**{column: pa.int8() for column in DERIVED_COLUMNS}, 'Month': pa.int32()}
+
+# explicit schema for the store which only keeps the columns that the pages use. airports and airlines are
+# dictionary encoded, the delay minutes and flags are stored as small integers and the derived columns from
+# flights.derive are stored as well so they only have to be computed once.
+SCHEMA = pa.schema([
+    ('FL_DATE', pa.timestamp('s')),
+    ('AIRLINE', pa.dictionary(pa.int8(), pa.string())),
+    ('FL_NUMBER', pa.int16()),
+    ('ORIGIN', pa.dictionary(pa.int16(), pa.string())),
+    ('DEST', pa.dictionary(pa.int16(), pa.string())),
+    ('CRS_DEP_TIME', pa.int16()),
+    ('CRS_ARR_TIME', pa.int16()),
+    ('DEP_DELAY', pa.int16()),
+    ('ARR_DELAY', pa.int16()),
+    ('CANCELLED', pa.int8()),
+    ('DIVERTED', pa.int8()),
+] + [(column, pa.int16()) for column in DELAY_COLUMNS] + list(DERIVED_TYPES.items()))
+
+COLUMNS = SCHEMA.names
+# the columns which are read from the csv.
+SOURCE_COLUMNS = [column for column in COLUMNS if column not in DERIVED_COLUMNS]
+
+# pandas dtypes matching the schema above, delays use the nullable Int16 since cancelled and on time flights have no value.
+DTYPES = {
+    'AIRLINE': 'category', 'FL_NUMBER': 'int16', 'ORIGIN': 'category', 'DEST': 'category',
+    'CRS_DEP_TIME': 'int16', 'CRS_ARR_TIME': 'int16', 'DEP_DELAY': 'Int16', 'ARR_DELAY': 'Int16',
+    'CANCELLED': 'int8', 'DIVERTED': 'int8', **{column: 'Int16' for column in DELAY_COLUMNS}
+}
+
+
+# converting a raw frame read from the csv into the compact types used by the store and adding the derived columns.
+def apply_schema(frame):
+    frame = frame[SOURCE_COLUMNS].copy()
+    frame['FL_DATE'] = pd.to_datetime(frame['FL_DATE']).astype('datetime64[s]')
+    for column, dtype in DTYPES.items():
+        frame[column] = frame[column].astype(dtype)
+    return add_derived_columns(frame)
+
+
+# reading only the used columns from the csv and typing them.
+def read_csv(csv=CSV_PATH, **kwargs):
+    return apply_schema(pd.read_csv(csv, usecols=SOURCE_COLUMNS, **kwargs))
+
+
+# the partition key of each row, which is the year and month of the flight date (for example 2023-01).
+def partition_keys(frame):
+    return frame['FL_DATE'].dt.strftime('%Y-%m')
+
+
+# the partition key of a Month (see flights.derive), for example 2023-01 for 202301.
+def partition_key(month):
+    return f"{int(month) // 100}-{int(month) % 100:02d}"
+
+
+# writing each month as its own parquet file under store_dir/month=YYYY-MM/.
+def write_partition(frame, month, store_dir=STORE_DIR):
+    partition_dir = os.path.join(store_dir, f"month={month}")
+    os.makedirs(partition_dir, exist_ok=True)
+    table = pa.Table.from_pandas(frame, schema=SCHEMA, preserve_index=False)
+    pq.write_table(table, os.path.join(partition_dir, "part-0.parquet"))
+
+
+# converting the whole csv into the store in one go. the store is written next to the old one and then swapped in, so no
+# months of the old store (such as appended ones) are left behind. returns the flights in the order they are read back
+# from the store, which is month by month.
+def build_store(csv=CSV_PATH, store_dir=STORE_DIR):
+    frame = read_csv(csv)
+    keys = partition_keys(frame)
+    shutil.rmtree(f"{store_dir}.tmp", ignore_errors=True)
+    for month, month_frame in frame.groupby(keys, sort=True):
+        write_partition(month_frame, month, f"{store_dir}.tmp")
+    # a store left over from a build which stopped before removing it would make the swap fail.
+    shutil.rmtree(f"{store_dir}.old", ignore_errors=True)
+    if os.path.exists(store_dir):
+        os.replace(store_dir, f"{store_dir}.old")
+    os.replace(f"{store_dir}.tmp", store_dir)
+    shutil.rmtree(f"{store_dir}.old", ignore_errors=True)
+    return pd.concat([month_frame for _, month_frame in frame.groupby(keys, sort=True)], ignore_index=True)
+
+
+def store_exists(store_dir=STORE_DIR):
+    return os.path.isdir(store_dir) and any(name.startswith("month=") for name in os.listdir(store_dir))
+
+
+# list of the months (YYYY-MM) currently in the store.
+def store_months(store_dir=STORE_DIR):
+    if not store_exists(store_dir):
+        return []
+    return sorted(name.split("=", 1)[1] for name in os.listdir(store_dir) if name.startswith("month="))
+
+
+def partition_path(month, store_dir=STORE_DIR):
+    return os.path.join(store_dir, f"month={month}", "part-0.parquet")
+
+
+# the version of the store, which changes whenever a month is added to it.
+def store_version(store_dir=STORE_DIR):
+    return tuple(store_months(store_dir))
+
+
+# a fingerprint of the flights in the store, which changes whenever any of its months is written again (for example by
+# another ingest) even when the months and the number of flights stay the same.
+def store_fingerprint(store_dir=STORE_DIR):
+    paths = [partition_path(month, store_dir) for month in store_months(store_dir)]
+    return ";".join(f"{path}:{os.path.getsize(path)}:{os.path.getmtime(path)}" for path in paths)
+
+
+# total number of flights in the store, read from the parquet metadata without loading any of them.
+def store_rows(store_dir=STORE_DIR):
+    return sum(pq.ParquetFile(partition_path(month, store_dir)).metadata.num_rows
+               for month in store_months(store_dir))
+
+
+# reading the store with column projection and optionally only some of its month partitions.
+def read_store(store_dir=STORE_DIR, columns=None, months=None):
+    filters = [('month', 'in', list(months))] if months is not None else None
+    return pd.read_parquet(store_dir, columns=list(columns or COLUMNS), filters=filters)
+
+
+# names of the columns in the store, which may be missing the derived columns if it was built by an older version. derived
+# columns stored with another type by an older version (such as the calendar month without its year) are left out as well.
+def stored_columns(store_dir=STORE_DIR):
+    month = store_months(store_dir)[0]
+    schema = pq.read_schema(partition_path(month, store_dir))
+    return [field.name for field in schema if field.type == DERIVED_TYPES.get(field.name, field.type)]
+
+
+# loading the flights data from the store, falling back to parsing the csv when the store has not been built yet.
+def load_data(csv=CSV_PATH, columns=None, store_dir=STORE_DIR):
+    columns = list(columns or COLUMNS)
+    if store_exists(store_dir):
+        stored = stored_columns(store_dir)
+        frame = read_store(store_dir, [column for column in columns if column in stored])
+    else:
+        frame = read_csv(csv)
+    return add_derived_columns(frame, [column for column in columns if column in DERIVED_COLUMNS])[columns]
+
+
+# writing the flights as one arrow ipc file with a single chunk per column, so every column can be mapped as one array.
+# the file is written next to the old one and then swapped in, so apps which have the old one mapped keep working.
+def write_arrow(frame, path=ARROW_PATH):
+    table = pa.Table.from_pandas(frame, schema=SCHEMA, preserve_index=False).combine_chunks()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with pa.OSFile(f"{path}.tmp", "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(f"{path}.tmp", path)
+
+
+# the version of a file written by the ingest (the arrow file, the cube, the route matrix, ...), which changes whenever it
+# is written again, or None when it doesn't exist.
+def file_version(path):
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+
+# a column of the arrow file as a pandas array which points straight into the mapped file instead of copying it. the
+# nullable delay columns become pyarrow backed arrays, since pandas' own nullable integers need a copy of the nulls.
+def mapped_array(name, column):
+    column = column.combine_chunks() if column.num_chunks != 1 else column.chunk(0)
+    if pa.types.is_dictionary(column.type):
+        codes = column.indices.to_numpy(zero_copy_only=True)
+        return pd.Categorical.from_codes(codes, categories=column.dictionary.to_pandas(), validate=False)
+    if DTYPES.get(name) == 'Int16':
+        return pd.arrays.ArrowExtensionArray(column)
+    return column.to_numpy(zero_copy_only=True)
+
+
+# mapping the arrow file into memory. the pages only read from the mapped columns, so the operating system keeps one copy
+# of the file in its page cache which is shared by every streamlit process on the machine, and nothing has to be parsed.
+def map_arrow(path=ARROW_PATH, columns=None):
+    table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    columns = list(columns or table.column_names)
+    return pd.DataFrame({name: mapped_array(name, table[name]) for name in columns}, copy=False)
@@ -0,0 +1,60 @@
+import argparse
+from functools import partial
+
+import pandas as pd
+
+from flights.cube import CUBE_PATH, build_cube, merge_cubes, save_cube
+from flights.routes import ROUTES_PATH, build_routes, merge_routes, save_routes
+from flights.sketches import DELAYS, SKETCH_DIR, build_sketches, merge_sketches, save_sketches
+from flights.store import SOURCE_COLUMNS, apply_schema
+
+# everything which is aggregated from the chunks, as how to build it from a chunk and how to add up the parts.
+AGGREGATES = {
+    'cube': (build_cube, merge_cubes),
+    'routes': (build_routes, merge_routes),
+    **{side: (partial(build_sketches, side=side), partial(merge_sketches, side=side)) for side in DELAYS},
+}
+
+
+# building the aggregate cube, the route matrix and the delay sketches from csvs which are too big to load into memory. the
+# csvs are read chunksize rows at a time, each chunk is aggregated on its own, and the partial aggregates are added up every
+# merge_every chunks, so that memory only ever holds one chunk plus the distinct cube keys, routes and sketch buckets. those
+# are keyed by year and month, so the years of a multi-year history are kept apart and only grow by a month at a time.
+def stream_aggregates(csvs, chunksize=500_000, merge_every=8):
+    merged = dict.fromkeys(AGGREGATES)
+    partials = {name: [] for name in AGGREGATES}
+    flights = 0
+    for csv in csvs:
+        for chunk in pd.read_csv(csv, usecols=SOURCE_COLUMNS, chunksize=chunksize):
+            chunk = apply_schema(chunk)
+            for name, (build, _) in AGGREGATES.items():
+                partials[name].append(build(chunk))
+            flights += len(chunk)
+            if len(partials['cube']) >= merge_every:
+                merged = {name: merge([merged[name]] + partials[name]) for name, (_, merge) in AGGREGATES.items()}
+                partials = {name: [] for name in AGGREGATES}
+    return {name: merge([merged[name]] + partials[name]) for name, (_, merge) in AGGREGATES.items()}, flights
+
+
+# command line entry point for the out-of-core aggregation, run with: python -m flights.stream data/flights_2019_2023.csv
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aggregate flights csvs of any size into the cube in bounded-size chunks.")
+    parser.add_argument("csvs", nargs="+", help="paths to the flights csvs")
+    parser.add_argument("--cube", default=CUBE_PATH, help="path to write the aggregate cube to")
+    parser.add_argument("--routes", default=ROUTES_PATH, help="path to write the route matrix to")
+    parser.add_argument("--sketches", default=SKETCH_DIR, help="directory to write the delay percentile sketches to")
+    parser.add_argument("--chunksize", type=int, default=500_000, help="number of csv rows to read at a time")
+    parser.add_argument("--merge-every", type=int, default=8, help="number of chunks to aggregate before merging them")
+    args = parser.parse_args(argv)
+
+    aggregates, flights = stream_aggregates(args.csvs, args.chunksize, args.merge_every)
+    save_cube(aggregates['cube'], args.cube)
+    save_routes(aggregates['routes'], args.routes)
+    for side in DELAYS:
+        save_sketches(aggregates[side], side, args.sketches)
+    print(f"aggregated {flights:,} flights into {len(aggregates['cube']):,} aggregate rows in {args.cube}")
+    print(f"and {len(aggregates['routes']):,} route entries in {args.routes} and the delay sketches in {args.sketches}")
+
+
+if __name__ == "__main__":
+    main()
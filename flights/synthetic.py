@@ -0,0 +1,117 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from flights.store import SOURCE_COLUMNS
+from flights.status import DELAY_COLUMNS
+
+# airlines with roughly their share of the flights in the real dataset.
+AIRLINES = {
+    'Southwest Airlines Co.': 0.19, 'Delta Air Lines Inc.': 0.13, 'American Airlines Inc.': 0.13,
+    'SkyWest Airlines Inc.': 0.11, 'United Air Lines Inc.': 0.09, 'Republic Airline': 0.05, 'Envoy Air': 0.04,
+    'Endeavor Air Inc.': 0.04, 'JetBlue Airways': 0.04, 'PSA Airlines Inc.': 0.04, 'Alaska Airlines Inc.': 0.03,
+    'Spirit Air Lines': 0.03, 'Mesa Airlines Inc.': 0.02, 'Frontier Airlines Inc.': 0.02, 'Allegiant Air': 0.02,
+    'Hawaiian Airlines Inc.': 0.01, 'Horizon Air': 0.01,
+}
+
+# the busiest airports in order, the rest of the airports get made up three letter codes.
+HUBS = ['ATL', 'DFW', 'DEN', 'ORD', 'LAX', 'CLT', 'MCO', 'LAS', 'PHX', 'MIA', 'SEA', 'IAH', 'JFK', 'EWR', 'SFO',
+        'FLL', 'MSP', 'BOS', 'DTW', 'LGA', 'PHL', 'SLC', 'BWI', 'DCA', 'SAN', 'IAD', 'TPA', 'BNA', 'AUS', 'MDW']
+AIRPORTS = 350
+
+# share of the scheduled departures in each hour of the day.
+HOUR_WEIGHTS = np.array([2, 1, 1, 1, 1, 8, 55, 65, 62, 58, 56, 55, 56, 55, 54, 55, 56, 57, 55, 50, 40, 28, 16, 8],
+                        dtype=float)
+
+CANCELLED_RATE = 0.02
+DIVERTED_RATE = 0.0025
+
+
+def airport_codes(rng):
+    codes = list(HUBS)
+    while len(codes) < AIRPORTS:
+        code = ''.join(rng.choice(list('ABCDEFGHIJKLMNOPQRSTUVWXYZ'), 3))
+        if code not in codes:
+            codes.append(code)
+    return np.array(codes)
+
+
+# generating rows flights with the same columns and value ranges as the columns the pages read from the real csv.
+# airports follow a zipf-like popularity, departure times follow the daily schedule, most flights leave early or on
+# time with a long tail of delays, and the delay causes of the flights arriving 15+ minutes late add up to their delay.
+def generate(rows, seed=0, start='2023-01-01', end='2023-08-31'):
+    rng = np.random.default_rng(seed)
+    airports = airport_codes(np.random.default_rng(0))
+    popularity = 1 / np.arange(1, len(airports) + 1) ** 1.1
+    popularity /= popularity.sum()
+
+    days = pd.date_range(start, end, freq='D')
+    dates = days[rng.integers(0, len(days), rows)]
+
+    airlines = np.array(list(AIRLINES))
+    shares = np.array(list(AIRLINES.values()))
+    origin = rng.choice(len(airports), rows, p=popularity)
+    dest = rng.choice(len(airports), rows, p=popularity)
+    # a flight never lands where it took off, so those destinations are moved to the next airport.
+    dest = np.where(dest == origin, (dest + 1) % len(airports), dest)
+
+    dep_minutes = rng.choice(24, rows, p=HOUR_WEIGHTS / HOUR_WEIGHTS.sum()) * 60 + rng.integers(0, 12, rows) * 5
+    arr_minutes = (dep_minutes + np.clip(rng.lognormal(4.9, 0.5, rows), 40, 660).astype(int)) % 1440
+
+    cancelled = rng.random(rows) < CANCELLED_RATE
+    diverted = (rng.random(rows) < DIVERTED_RATE) & ~cancelled
+    dep_delay = np.where(rng.random(rows) < 0.62, rng.integers(-15, 1, rows),
+                         np.where(rng.random(rows) < 0.5, rng.integers(1, 15, rows),
+                                  np.clip(rng.lognormal(3.6, 1.0, rows), 15, 1500).astype(int))).astype(float)
+    arr_delay = np.clip(dep_delay + np.round(rng.normal(-5, 9, rows)), -80, 1500)
+    dep_delay[cancelled] = np.nan
+    arr_delay[cancelled | diverted] = np.nan
+
+    frame = pd.DataFrame({
+        'FL_DATE': dates.strftime('%Y-%m-%d'),
+        'AIRLINE': airlines[rng.choice(len(airlines), rows, p=shares / shares.sum())],
+        'FL_NUMBER': rng.integers(1, 7000, rows),
+        'ORIGIN': airports[origin],
+        'DEST': airports[dest],
+        'CRS_DEP_TIME': dep_minutes // 60 * 100 + dep_minutes % 60,
+        'CRS_ARR_TIME': arr_minutes // 60 * 100 + arr_minutes % 60,
+        'DEP_DELAY': dep_delay,
+        'ARR_DELAY': arr_delay,
+        'CANCELLED': cancelled.astype(float),
+        'DIVERTED': diverted.astype(float),
+    })
+
+    # splitting each reportable delay between a few of the causes, the split minutes add up to the arrival delay.
+    late = arr_delay >= 15
+    split = rng.dirichlet(np.full(len(DELAY_COLUMNS), 0.3), rows)
+    minutes = np.floor(split * np.nan_to_num(arr_delay)[:, None])
+    minutes[:, -1] += np.nan_to_num(arr_delay) - minutes.sum(axis=1)
+    for position, column in enumerate(DELAY_COLUMNS):
+        frame[column] = np.where(late, minutes[:, position], np.nan)
+    return frame[SOURCE_COLUMNS]
+
+
+# writing a synthetic csv in chunks, so that even 30M flights never have to be held in memory at once.
+def write_csv(path, rows, seed=0, chunksize=1_000_000, start='2023-01-01', end='2023-08-31'):
+    for chunk, offset in enumerate(range(0, rows, chunksize)):
+        frame = generate(min(chunksize, rows - offset), seed=(seed, chunk), start=start, end=end)
+        frame.to_csv(path, mode='w' if chunk == 0 else 'a', header=chunk == 0, index=False)
+
+
+# command line entry point for making a synthetic csv, run with: python -m flights.synthetic data/flights_sample_3m.csv
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic flights csv with the columns the pages read.")
+    parser.add_argument("csv", help="path to write the csv to")
+    parser.add_argument("--rows", type=int, default=3_000_000, help="number of flights to generate")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random generator")
+    parser.add_argument("--start", default='2023-01-01', help="first flight date")
+    parser.add_argument("--end", default='2023-08-31', help="last flight date")
+    args = parser.parse_args(argv)
+
+    write_csv(args.csv, args.rows, args.seed, start=args.start, end=args.end)
+    print(f"wrote {args.rows:,} synthetic flights to {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
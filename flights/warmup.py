@@ -0,0 +1,76 @@
+import logging
+import threading
+import time
+
+import streamlit as st
+from streamlit import runtime
+
+from flights import config, data, query
+
+logger = logging.getLogger(__name__)
+
+# how far the warm-up of this process has got, shown by show_status() on every page. state goes from idle to running and
+# then to ready (or failed), step is the step being run and seconds how long the whole warm-up took.
+STATUS = {'state': 'idle', 'step': None, 'seconds': None, 'error': None}
+lock = threading.Lock()
+
+
+# the data every page needs, in the order the pages need it. which of it is loaded depends on the data mode and backend,
+# the same way as in flights.query.
+def steps():
+    rows = config.DATA_MODE != "aggregates"
+    steps = [("flights data", data.get_flights)] if rows else []
+    steps.append(("aggregates", data.get_cube))
+    if rows and not query.duckdb_backend():
+        steps.append(("airport indexes", lambda: [data.get_index(side) for side in ['ORIGIN', 'DEST']]))
+    steps.append(("drill-downs", lambda: [data.get_drilldowns(side) for side in ['ORIGIN', 'DEST']]))
+    steps.append(("delay sketches", lambda: [data.get_sketches(side) for side in ['ORIGIN', 'DEST']]))
+    steps.append(("routes", data.get_routes))
+    if config.PREVIEW:
+        steps.append(("sample", data.get_sample))
+    # the Home page lookups which every session makes first, which also opens the duckdb connection.
+    steps.append(("home lookups", lambda: (query.months(), query.airlines())))
+    return steps
+
+
+# loading everything into the shared st.cache_resource caches. a session which needs something that is still being loaded
+# waits for it on the cache's lock instead of loading it a second time.
+def warm_up():
+    # waiting for the server to start, and keeping streamlit from warning that this thread isn't running a page.
+    while not runtime.exists():
+        time.sleep(0.05)
+    context_logger = logging.getLogger("streamlit.runtime.scriptrunner.script_run_context")
+    context_level = context_logger.level
+    context_logger.setLevel(logging.ERROR)
+
+    started = time.perf_counter()
+    try:
+        for name, step in steps():
+            STATUS['step'] = name
+            step()
+    except Exception as error:
+        logger.exception("warm-up failed")
+        STATUS.update(state='failed', step=None, error=str(error))
+    else:
+        STATUS.update(state='ready', step=None, seconds=time.perf_counter() - started)
+        logger.info("warm-up finished in %.2fs", STATUS['seconds'])
+    finally:
+        context_logger.setLevel(context_level)
+
+
+# starting the warm-up on a background thread, once per process.
+def start():
+    with lock:
+        if STATUS['state'] != 'idle':
+            return
+        STATUS['state'] = 'running'
+    threading.Thread(target=warm_up, name="flights-warmup", daemon=True).start()
+
+
+def show_status():
+    if STATUS['state'] == 'ready':
+        st.sidebar.caption(f"✅ Data ready (warmed up in {STATUS['seconds']:.1f}s)")
+    elif STATUS['state'] == 'failed':
+        st.sidebar.caption(f"⚠️ Warm-up failed: {STATUS['error']}")
+    else:
+        st.sidebar.caption(f"⏳ Warming up: loading {STATUS['step'] or 'data'}...")
@@ -1,24 +1,30 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
-import base64
 import plotly.graph_objects as go
+from flights import assets, figures, profile, status, warmup
+from flights.derive import month_label
+from flights.query import airlines_at, airports, delay_percentiles, drilldown, months
 
 st.set_page_config(
     page_title="Departure Analysis",
     page_icon='✈️'
     )
 
-# reading the gif file as binary data and then encoding it as a base64, and storing the result as a string.
-with open("data/take-off.gif", "rb") as f:
-    gif_data = f.read()
-gif = base64.b64encode(gif_data).decode()
+# loading the data in the background if the server wasn't started with flights.serve, and showing whether it is ready.
+warmup.start()
+warmup.show_status()
+
+# timing each chart section when profiling is turned on (FLIGHTS_PROFILE=1).
+profile.start('Departures')
+
+# the url of the gif, which is served as a static file so the browser only downloads it once instead of on every rerun.
+gif = assets.image_url("take-off.gif")
 
 # creating a centrerd layout with the gif and tile being in the same line and there being 10 pixels of space between the gif and title.
 st.markdown(
     f"""
     <div style="display: flex; justify-content: center; align-items: center;">
-        <img src="data:image/gif;base64,{gif}" alt="gif" width="100">
+        <img src="{gif}" alt="gif" width="100">
         <h1 style="margin-left: 10px;"> Departure Analysis</h1>
     </div>
     """,
@@ -29,51 +35,97 @@ st.markdown("<hr style='border: 1px solid #f0f0f0;'>", unsafe_allow_html=True)
 
 st.write("On this page, you will gain more insights into departure patterns and airline performance at various airports and airlines. Explore the busiest departure times, track flight status distributions, and delve into the average delay times caused by different delay types.")
 
-# added cache to ensure that the data doesn't have to be reloaded everytime the file runs.
-@st.cache_data
-def load_data(csv):
-    return pd.read_csv(csv)
-
-# reading the csv.
-flights_data = load_data("data/flights_sample_3m.csv")
-
-
 st.header("Filter Flight Data by Airlines and Departure Airport")
 # CREATING THE SELECT BOXES ONE FOR AIRPORT AND THEN ANOTHER WHICH FILTERS BASED ON THAT 
-selected_airport_dep = st.selectbox('Select Departure Airport', sorted(flights_data['ORIGIN'].unique()))
-filtered_airlines = flights_data[flights_data['ORIGIN'] == selected_airport_dep]['AIRLINE'].unique()
+profile.phase('airports', 'compute')
+selected_airport_dep = st.selectbox('Select Departure Airport', airports('ORIGIN'))
+filtered_airlines = airlines_at('ORIGIN', selected_airport_dep)
 selected_airline_dep = st.selectbox('Select Airline', sorted(filtered_airlines))
 st.markdown("<b>*Note: </b> This selection will be used to filter all the charts below.",unsafe_allow_html=True)
 
 
 
-# BUSIEST DEPARTURE TIMES
-st.subheader(f'Busiest Departure Times at {selected_airport_dep} with {selected_airline_dep}')
+# building the charts of the selected airport and airline, which all come from its drill-down and so are cached together
+# by flights.figures, the delay type chart is None when none of the flights were delayed.
+def drilldown_charts():
+    profile.phase('departure hours', 'compute')
+    # looking up the drill-down of the user's selected airport and airline, which has the number of flights for each departure hour
+    # and the classification of their status and delay types.
+    selected_drilldown = drilldown('ORIGIN', selected_airport_dep, selected_airline_dep)
+
+    # setting the hours and the departure counts for all hours.
+    hours = [(f'{h % 12 if h % 12 != 0 else 12} {"AM" if h < 12 else "PM"}') for h in range(24)]
+    count_all_hours = dict(enumerate(selected_drilldown.hour_counts))
 
-# converting departure time to datetime forma and then extracting hour from departure time.
-flights_data['CRS_DEP_TIME'] = pd.to_datetime(flights_data['CRS_DEP_TIME'], format='%H%M', errors='coerce')
-flights_data['DepHour'] = flights_data['CRS_DEP_TIME'].dt.hour
+    profile.phase('departure hours', 'figure')
+    # plotting, formatting x-axis to display in AM/PM and adding a tool tip.
+    fig1 = px.bar(x=hours, y=[count_all_hours[hour] for hour in range(24)],
+                  labels={'x': 'Departure Hour', 'y': 'Number of Flights'},
+                  title=f'Busiest Departure Times from {selected_airport_dep} with {selected_airline_dep}')
+    fig1.update_xaxes(tickmode='array')
+    fig1.update_traces(hovertemplate='<b>Departure Hour:</b> %{x}<br><b>Number of Flights:</b> %{y}<extra></extra>', marker_color='#048092')
 
-# filtering data based on user's selected airport and airline.
-filtered_data_dep = flights_data[(flights_data['ORIGIN'] == selected_airport_dep) & (flights_data['AIRLINE'] == selected_airline_dep)]
+    profile.phase('flight status', 'compute')
+    # the classification of the selected flights gives the status counts for this donut chart and the delay types for the next one.
+    classification = selected_drilldown.classification
+
+    # calculating flight count for cancelled, delayed and or diverted flights.
+    flight_status_counts = status.count_statuses(classification.code_counts, status.DEPARTURE_STATUSES)
+
+    # setting color based on the flight status.
+    colors = {'Delayed': '#83C9FF', 'Cancelled': '#FF2B2B', 'On time': '#0068C9'}
+
+    profile.phase('flight status', 'figure')
+    # making the donut chart with flight overall status and adding a tooltip.
+    fig3 = go.Figure()
+    fig3.add_trace(go.Pie(
+        labels=list(flight_status_counts.keys()),
+        values=list(flight_status_counts.values()),
+        textinfo='label+percent', 
+        hole=0.5,
+        hovertemplate='<b>Flight Status:</b> %{label}<br>' + '<b>Value:</b> %{value}<br>' + '<b>Percent of Total:</b> %{percent}',
+        marker=dict(colors= [colors[key] for key in flight_status_counts.keys()])))
+    fig3.update_layout(
+        title_text="Flight Status Distribution")
+
+    # no second donut chart is made when none of the flights were delayed.
+    if flight_status_counts["Delayed"] == 0:
+        return fig1, fig3, None
+
+    fig4 = go.Figure()
 
-# counting occurrences of each departure hour.
-departure_counts = filtered_data_dep['DepHour'].value_counts().sort_index()
+    profile.phase('delay type', 'compute')
+    # counting the data which includes only rows where departure delay is positive since if its negaitve it suggets that it was early/ on time.
+    delay_counts = classification.cause_counts
+
+    # average delay times for each delay category just to add that to my tool tip.
+    avg_delay_times = classification.cause_means
+
+    profile.phase('delay type', 'figure')
+    # setting color based on the delay type.
+    colors = {'Carrier Delay': '#FF2B2B', 'Weather Delay': '#7DEFA1', 'NAS Delay': '#29B09D','Security Delay':'#483C32', 'Late Aircraft Delay':'#FF8700'}
+
+    # making the donut chart with delay types and adding a tool tip.
+    fig4.add_trace(go.Pie(
+        labels=delay_counts.index,
+        values=delay_counts.values,
+        textinfo='label+percent', 
+        hole=0.5,
+        hovertemplate='<b>Cause of Delay:</b> %{label}<br>' + '<b>Average Delay Time:</b> ' + avg_delay_times.round(2).astype(str) + ' minutes <br>' + '<b>Percent of Total:</b> %{percent}',        
+        marker=dict(colors= [colors[key] for key in delay_counts.keys()])))
+    fig4.update_layout(
+        title_text="Average Delay Times by Delay Type")
+    return fig1, fig3, fig4
 
-# setting the hours and initializing departure counts for all hours.
-hours = [(f'{h % 12 if h % 12 != 0 else 12} {"AM" if h < 12 else "PM"}') for h in range(24)]
-count_all_hours = {hour: 0 for hour in range(24)}
+profile.phase('drill-down', 'cached')
+fig1, fig3, fig4 = figures.cached('Departures', 'drill-down', (selected_airport_dep, selected_airline_dep), drilldown_charts)
 
-# counting occurrences of each departure hours.
-for hour, count in departure_counts.items():
-    count_all_hours[hour] = count
 
-# plotting, formatting x-axis to display in AM/PM and adding a tool tip.
-fig1 = px.bar(x=hours, y=[count_all_hours[hour] for hour in range(24)],
-              labels={'x': 'Departure Hour', 'y': 'Number of Flights'},
-              title=f'Busiest Departure Times from {selected_airport_dep} with {selected_airline_dep}')
-fig1.update_xaxes(tickmode='array')
-fig1.update_traces(hovertemplate='<b>Departure Hour:</b> %{x}<br><b>Number of Flights:</b> %{y}<extra></extra>', marker_color='#048092')
+
+# BUSIEST DEPARTURE TIMES
+st.subheader(f'Busiest Departure Times at {selected_airport_dep} with {selected_airline_dep}')
+
+profile.phase('departure hours', 'render')
 st.plotly_chart(fig1)
 
 
@@ -81,65 +133,65 @@ st.plotly_chart(fig1)
 # FLIGTH STATUS AND DELAYS TYPE DISTRIBUTION DUNUT CHART
 st.subheader("Flight Status Distribution")
 
-# calculating flight count for cancelled, delayed and or diverted flights.
-flight_status_counts = {"Cancelled": filtered_data_dep['CANCELLED'].sum(),
-    "Delayed": filtered_data_dep[filtered_data_dep['DEP_DELAY'] > 0].shape[0],
-    "On time": filtered_data_dep[(filtered_data_dep['CANCELLED'] == 0) & (filtered_data_dep['DEP_DELAY'] <= 0)].shape[0]
-}
-
-# setting color based on the flight status.
-colors = {'Delayed': '#83C9FF', 'Cancelled': '#FF2B2B', 'On time': '#0068C9'}
-
 st.write(f"The donut chart below shows the percent of flights departing from {selected_airport_dep} airport on {selected_airline_dep} that were on time, or experienced delays and/or cancellations.")
 
-# making the donut chart with flight overall status and adding a tooltip.
-fig3 = go.Figure()
-fig3.add_trace(go.Pie(
-    labels=list(flight_status_counts.keys()),
-    values=list(flight_status_counts.values()),
-    textinfo='label+percent', 
-    hole=0.5,
-    hovertemplate='<b>Flight Status:</b> %{label}<br>' + '<b>Value:</b> %{value}<br>' + '<b>Percent of Total:</b> %{percent}',
-    marker=dict(colors= [colors[key] for key in flight_status_counts.keys()])))
-fig3.update_layout(
-    title_text="Flight Status Distribution")
+profile.phase('flight status', 'render')
 st.plotly_chart(fig3, use_container_width=True, center=True)
 
 
 
 # setting it so that if no flights were delayed, it prints my defined staement and if they were, then the second donut chart is printed.
-if flight_status_counts["Delayed"] == 0:
+if fig4 is None:
     st.write("*No flights were delayed thus further analysis on delay distribution is not applicable.*")
 
 else:
-    # renaming my columns so that I can use it later to make sure its easy for my users.
-    filtered_data_dep.rename(columns={'DELAY_DUE_CARRIER': 'Carrier Delay','DELAY_DUE_WEATHER': 'Weather Delay',
-                              'DELAY_DUE_NAS': 'NAS Delay','DELAY_DUE_SECURITY': 'Security Delay',
-                              'DELAY_DUE_LATE_AIRCRAFT': 'Late Aircraft Delay'}, inplace=True)
-
     st.subheader("Average Dalay caused by Each Delay Type")
-    st.write(f"The donut chart below shows the the percent of flights departing from {selected_airport_dep} airport on {selected_airline_dep} that experienced delays due to specific delay types. Hover over the chart to view the average delay time (in minutes) caused by each delay type.")  
+    st.write(f"The donut chart below shows the the percent of flights departing from {selected_airport_dep} airport on {selected_airline_dep} that experienced delays due to specific delay types. Hover over the chart to view the average delay time (in minutes) caused by each delay type.")
 
-    fig4 = go.Figure()
-    
-    # filtering and then counting the data which includes only rows where departure delay is positive since if its negaitve it suggets that it was early/ on time.
-    pos_delay = filtered_data_dep[filtered_data_dep['DEP_DELAY'] > 0]
-    delay_counts = pos_delay[['Carrier Delay', 'Weather Delay', 'NAS Delay', 'Security Delay', 'Late Aircraft Delay']].apply(lambda x: (x > 0).sum())
+    profile.phase('delay type', 'render')
+    st.plotly_chart(fig4, use_container_width=True, center=True)
 
-    # calculating average delay times for each delay category just to add that to my tool tip. 
-    avg_delay_times = pos_delay[['Carrier Delay', 'Weather Delay', 'NAS Delay', 'Security Delay', 'Late Aircraft Delay']].mean()
 
-    # setting color based on the delay type.
-    colors = {'Carrier Delay': '#FF2B2B', 'Weather Delay': '#7DEFA1', 'NAS Delay': '#29B09D','Security Delay':'#483C32', 'Late Aircraft Delay':'#FF8700'}
 
-    # making the donut chart with delay types and adding a tool tip.
-    fig4.add_trace(go.Pie(
-        labels=delay_counts.index,
-        values=delay_counts.values,
-        textinfo='label+percent', 
-        hole=0.5,
-        hovertemplate='<b>Cause of Delay:</b> %{label}<br>' + '<b>Average Delay Time:</b> ' + avg_delay_times.round(2).astype(str) + ' minutes <br>' + '<b>Percent of Total:</b> %{percent}',        
-        marker=dict(colors= [colors[key] for key in delay_counts.keys()])))
-    fig4.update_layout(
-        title_text="Average Delay Times by Delay Type")
-    st.plotly_chart(fig4, use_container_width=True, center=True) 
\ No newline at end of file
+# DELAY PERCENTILES
+st.subheader("Delay Percentiles by Delay Type")
+
+st.write(f"The bar chart below shows the median (p50), 90th (p90) and 99th (p99) percentile of the departure delay of flights departing from {selected_airport_dep} airport on {selected_airline_dep}, for all of them and for the delayed flights of each delay type. Unlike the averages above, these aren't pulled up by a few extremely long delays. Hover over a bar to view the number of flights it covers.")
+
+# the percentiles cover all the months unless some are selected.
+month_names = {m: month_label(m) for m in months()}
+selected_months_dep = st.multiselect('Select Month(s)', list(month_names.values()), placeholder='All Months')
+selected_month_indexes = [m for m, name in month_names.items() if name in selected_months_dep] or None
+
+
+# building the grouped bar chart of the delay percentiles, which is None when none of the flights reported a departure delay.
+def delay_percentiles_chart():
+    profile.phase('delay percentiles', 'compute')
+    # looking up the percentiles from the delay sketches of the selected airport and airline, merged over the selected months.
+    percentiles = delay_percentiles('ORIGIN', selected_airport_dep, selected_airline_dep, selected_month_indexes)
+    percentiles = percentiles[percentiles['Flights'] > 0]
+    if percentiles.empty:
+        return None
+
+    profile.phase('delay percentiles', 'figure')
+    # one bar per percentile for each group of flights and adding a tooltip.
+    bars = percentiles.rename_axis('Delay Type').reset_index().melt(id_vars=['Delay Type', 'Flights'], value_vars=['p50', 'p90', 'p99'],
+                                                                    var_name='Percentile', value_name='Minutes')
+    fig5 = px.bar(bars, x='Delay Type', y='Minutes', color='Percentile', barmode='group', custom_data=['Flights'],
+                  color_discrete_sequence=['#83C9FF', '#0068C9', '#FF2B2B'],
+                  title='Departure Delay Percentiles by Delay Type', labels={'Minutes': 'Delay (minutes)'})
+    fig5.update_traces(hovertemplate='<b>%{x}</b><br><b>%{fullData.name}:</b> %{y:.0f} minutes<br>' + '<b>Number of Flights:</b> %{customdata[0]:,}<extra></extra>')
+    return fig5
+
+profile.phase('delay percentiles', 'cached')
+fig5 = figures.cached('Departures', 'delay percentiles', (selected_airport_dep, selected_airline_dep, tuple(selected_month_indexes or ())),
+                      delay_percentiles_chart)
+
+if fig5 is None:
+    st.write("*None of the flights reported a departure delay in the selected month(s).*")
+
+else:
+    profile.phase('delay percentiles', 'render')
+    st.plotly_chart(fig5, use_container_width=True)
+
+profile.finish()
@@ -0,0 +1,123 @@
+import streamlit as st
+import plotly.express as px
+from flights import assets, figures, profile, query, warmup
+from flights.derive import month_label
+
+st.set_page_config(
+    page_title="Route Analysis",
+    page_icon='✈️'
+    )
+
+# loading the data in the background if the server wasn't started with flights.serve, and showing whether it is ready.
+warmup.start()
+warmup.show_status()
+
+# timing each chart section when profiling is turned on (FLIGHTS_PROFILE=1).
+profile.start('Routes')
+
+# the url of the gif, which is served as a static file so the browser only downloads it once instead of on every rerun.
+gif = assets.image_url("airport.gif")
+
+# creating a centrerd layout with the gif and tile being in the same line and there being 10 pixels of space between the gif and title.
+st.markdown(
+    f"""
+    <div style="display: flex; justify-content: center; align-items: center;">
+        <img src="{gif}" alt="gif" width="100">
+        <h1 style="margin-left: 10px;"> Route Analysis</h1>
+    </div>
+    """,
+    unsafe_allow_html=True
+)
+# making a gray horizontal line under my title for a visual division.
+st.markdown("<hr style='border: 1px solid #f0f0f0;'>", unsafe_allow_html=True)
+
+st.write("On this page, you can look at the flights between pairs of airports rather than at a single airport. Find the busiest routes, see how often their flights arrived late and by how much, and explore every route flown from an airport.")
+
+st.header("Filter Flight Data by Month and Airline")
+# CREATING THE SELECT BOXES FOR THE MONTH AND THE AIRLINE, WHERE ALL MEANS NO FILTER
+profile.phase('filters', 'compute')
+months = {m: month_label(m) for m in query.months()}
+selected_month = st.selectbox("Select a Month", ['All'] + list(months.values()))
+selected_airline = st.selectbox("Select an Airline", ['All'] + list(query.airlines()))
+st.markdown("<b>*Note: </b> This selection will be used to filter all the charts below.",unsafe_allow_html=True)
+
+# turning the selections into the filters of the lookups, where None means all months or all airlines.
+selected_month_index = None if selected_month == 'All' else {name: month for month, name in months.items()}[selected_month]
+selected_airline_filter = None if selected_airline == 'All' else selected_airline
+
+# the text used in the titles for the selected month and airline.
+selection_text = ("across all months" if selected_month == 'All' else f"in {selected_month}") + \
+                 ("" if selected_airline == 'All' else f" on {selected_airline}")
+
+# the hover text of the route charts, where the delay rate is the percent of the flights which arrived late and the average
+# delay is how late those flights were on average.
+route_hover = ('<b>Flights:</b> %{x:,.0f}<br><b>Delay Rate:</b> %{customdata[0]:.1f}%<br>'
+               '<b>Average Delay:</b> %{customdata[1]:.1f} minutes<extra></extra>')
+
+
+
+# BUSIEST ROUTES
+st.subheader(f"Busiest Routes {selection_text[0].upper() + selection_text[1:]}")
+
+st.write("The bar chart below shows the busiest routes for the selected month and airline, coloured by the percent of their flights that arrived late. Hover over a route to see its average arrival delay.")
+
+number_of_routes = st.slider("Number of Routes", min_value=5, max_value=30, value=10)
+
+profile.phase('top routes', 'compute')
+# looking up the busiest routes from the route matrix, which is also shown as a table below the chart.
+top_routes = query.top_routes(selected_month_index, selected_airline_filter, number_of_routes)
+top_routes['Route'] = top_routes['ORIGIN'] + ' → ' + top_routes['DEST']
+
+
+# building the horizontal bar chart of the busiest routes, with the busiest at the top.
+def top_routes_chart():
+    profile.phase('top routes', 'figure')
+    fig1 = px.bar(top_routes.iloc[::-1], x='Flights', y='Route', orientation='h', color='DelayRate',
+                  custom_data=['DelayRate', 'AvgDelay'], color_continuous_scale='bluyl',
+                  title=f'Top {number_of_routes} Routes by Number of Flights',
+                  labels={'Flights': 'Number of Flights', 'Route': 'Route', 'DelayRate': 'Delay Rate (%)'})
+    fig1.update_traces(hovertemplate='<b>Route:</b> %{y}<br>' + route_hover)
+    fig1.update_layout(height=max(400, 25 * len(top_routes)))
+    return fig1
+
+profile.phase('top routes', 'cached')
+fig1 = figures.cached('Routes', 'top routes', (selected_month_index, selected_airline_filter, number_of_routes), top_routes_chart)
+profile.phase('top routes', 'render')
+st.plotly_chart(fig1, use_container_width=True)
+
+st.dataframe(top_routes[['Route', 'Flights', 'DelayRate', 'AvgDelay']].round(1), hide_index=True, use_container_width=True,
+             column_config={'DelayRate': 'Delay Rate (%)', 'AvgDelay': 'Average Delay (minutes)'})
+
+
+
+# ROUTES FROM AN AIRPORT
+st.subheader("Routes from an Airport")
+
+selected_airport = st.selectbox("Select Departure Airport", query.route_airports())
+
+profile.phase('fan-out', 'compute')
+# looking up every route from the selected airport, which only reads that airport's row of the route matrix.
+airport_routes = query.route_fanout(selected_airport, selected_month_index, selected_airline_filter)
+
+if airport_routes.empty:
+    st.write(f"*There were no flights from {selected_airport} {selection_text}.*")
+
+else:
+    st.write(f"Flights from {selected_airport} {selection_text} went to {len(airport_routes)} airport(s). The bar chart below shows the 20 busiest of them, coloured by the percent of their flights that arrived late.")
+
+    # building the bar chart of the busiest destinations from the selected airport.
+    def fanout_chart():
+        profile.phase('fan-out', 'figure')
+        busiest = airport_routes.head(20)
+        fig2 = px.bar(busiest, x='DEST', y='Flights', color='DelayRate', custom_data=['DelayRate', 'AvgDelay'],
+                      color_continuous_scale='bluyl', title=f'Busiest Routes from {selected_airport}',
+                      labels={'DEST': 'Destination Airport', 'Flights': 'Number of Flights', 'DelayRate': 'Delay Rate (%)'})
+        fig2.update_traces(hovertemplate='<b>Destination:</b> %{x}<br>' + route_hover.replace('%{x:,.0f}', '%{y:,.0f}'))
+        return fig2
+
+    profile.phase('fan-out', 'cached')
+    fig2 = figures.cached('Routes', 'fan-out', (selected_airport, selected_month_index, selected_airline_filter), fanout_chart)
+    profile.phase('fan-out', 'render')
+    st.plotly_chart(fig2, use_container_width=True)
+
+profile.finish()